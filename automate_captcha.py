@@ -1,5 +1,4 @@
 import logging
-import requests
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -11,10 +10,13 @@ import base64
 import os
 import cv2
 import numpy as np
-from PIL import Image
 import random
 import re
-from detect_puzzle import GeeTestIdentifier  # Assuming this is a custom module
+from vision.debug_sink import get_sink
+from vision.metrics import timed
+from vision.puzzle import GeeTestIdentifier, PuzzleMatcher, read_image
+from vision.result_cache import get_result_cache, image_key
+from vision.segmentation import HueSegmenter
 
 
 # Configure logging
@@ -24,6 +26,33 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(
 CAPTCHA_IMAGE_DIR = "captcha_images"
 os.makedirs(CAPTCHA_IMAGE_DIR, exist_ok=True)
 
+# Keep a copy of every downloaded CAPTCHA image in CAPTCHA_IMAGE_DIR. Detection
+# works on the in-memory image either way.
+ARCHIVE_CAPTCHA_IMAGES = os.environ.get("CAPTCHA_ARCHIVE", "0") == "1"
+
+# Debug images are written in the background for this fraction of the
+# attempts; 0 turns them off
+DEBUG_SINK = get_sink(CAPTCHA_IMAGE_DIR,
+                      sample_rate=float(os.environ.get("CAPTCHA_DEBUG_SAMPLE_RATE", "1")))
+
+# Results of the vision engines by image content, so retries that get the same
+# image skip the analysis. Set CAPTCHA_RESULT_CACHE to a SQLite file to keep
+# them across runs.
+RESULT_CACHE = get_result_cache(os.environ.get("CAPTCHA_RESULT_CACHE") or None)
+
+# Reuses its edge and response buffers across slider attempts
+PUZZLE_MATCHER = PuzzleMatcher()
+
+# Precise HSV ranges for each icon, inclusive
+ICON_HSV_RANGES = {
+    "cart": ([82, 80, 80], [88, 255, 255]),      # #14FFD5 (H: ~85)
+    "star": ([88, 80, 80], [94, 255, 255]),      # #00E0FF (H: ~91)
+    "calendar": ([115, 80, 80], [125, 255, 255]) # #6666FF (H: ~120)
+}
+
+# Labels all icon colours in one pass; the small kernel gives subtle noise reduction
+ICON_SEGMENTER = HueSegmenter(ICON_HSV_RANGES, kernel=np.ones((2, 2), np.uint8), min_area=50)
+
 class CaptchaSolver:
     def __init__(self, driver):
         self.driver = driver
@@ -46,7 +75,8 @@ class CaptchaSolver:
                 bg_img = self.get_canvas_image(canvas)
                 puzzle_img = self.get_canvas_image(puzzle_piece_element)
                 
-                identifier = GeeTestIdentifier(bg_img, puzzle_img)
+                identifier = GeeTestIdentifier(bg_img, puzzle_img, result_cache=RESULT_CACHE,
+                                               matcher=PUZZLE_MATCHER)
                 result = identifier.find_puzzle_piece_position()
                 
                 target_x = result['coordinates'][0] * scale_ratio
@@ -123,12 +153,15 @@ class CaptchaSolver:
                     logging.error("Failed to extract CAPTCHA image URL.")
                     continue
 
-                captcha_image_path = self.download_captcha_image(image_url)
-                if not captcha_image_path:
+                captcha_bytes = self.download_captcha_image(image_url)
+                if not captcha_bytes:
                     logging.error("Failed to download CAPTCHA image.")
                     continue
+                if ARCHIVE_CAPTCHA_IMAGES:
+                    self.archive_captcha_image(captcha_bytes)
 
-                captcha_image = cv2.imread(captcha_image_path)
+                # Decoded once, then used for scaling and detection
+                captcha_image = read_image(captcha_bytes)
                 if captcha_image is None:
                     logging.error("Failed to load CAPTCHA image for scaling.")
                     continue
@@ -141,7 +174,7 @@ class CaptchaSolver:
 
                 icon_order = self.get_icon_order()
                 logging.info(f"Icon order to be clicked: {icon_order}")
-                icon_positions = self.detect_icons(captcha_image_path, icon_order)
+                icon_positions = self.detect_icons(captcha_image, icon_order)
                 logging.info(f"Detected icon positions: {icon_positions}")
 
                 if not icon_positions or any(icon not in icon_positions for icon in icon_order):
@@ -252,46 +285,51 @@ class CaptchaSolver:
             logging.error(f"Error extracting icon order: {e}. Using default order.")
             return ["star", "calendar", "cart"]
 
-    def detect_icons(self, image_path, icon_order):
-        captcha_image = cv2.imread(image_path)
+    @timed("detect_icons")
+    def detect_icons(self, image, icon_order):
+        # Accepts a decoded image as well as raw bytes or a file path
+        captcha_image = read_image(image)
         if captcha_image is None:
             logging.error("Failed to load CAPTCHA image.")
             return {}
 
-        # Preprocess image to isolate icons by color
-        icon_masks = self.preprocess_image(captcha_image)
+        cache_key = image_key(captcha_image, engine="detect_icons", icon_order=list(icon_order),
+                              hsv_ranges=ICON_HSV_RANGES, min_area=ICON_SEGMENTER.min_area)
+        cached = RESULT_CACHE.get(cache_key)
+        if cached is not None:
+            logging.info(f"Icon positions from cache: {cached}")
+            return {name: tuple(position) for name, position in cached.items()}
+
+        # Segment all icon colours at once
+        debug = DEBUG_SINK.sample()
+        segmentation = self.preprocess_image(captcha_image, debug)
+        if segmentation is None:
+            return {}
         icon_positions = {}
         used_positions = set()
 
         for icon_name in icon_order:
-            mask = icon_masks[icon_name]
-            # Find contours to locate the icon
-            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            if contours:
-                # Sort contours by area and process the largest
-                contours = sorted(contours, key=cv2.contourArea, reverse=True)
-                for contour in contours[:1]:  # Only take the largest contour
-                    if cv2.contourArea(contour) > 50:  # Minimum area threshold
-                        M = cv2.moments(contour)
-                        if M["m00"] != 0:
-                            cX = int(M["m10"] / M["m00"])
-                            cY = int(M["m01"] / M["m00"])
-                            position = (cX, cY)
-                            # Relax proximity check further if needed
-                            if position not in used_positions and all(
-                                np.sqrt((cX - up[0])**2 + (cY - up[1])**2) > 5 for up in used_positions
-                            ):
-                                icon_positions[icon_name] = position
-                                used_positions.add(position)
-                                logging.info(f"Detected {icon_name} at {position} (area: {cv2.contourArea(contour)})")
-                            else:
-                                logging.warning(f"Position for {icon_name} at {position} too close to another icon or already used (area: {cv2.contourArea(contour)})")
-                        else:
-                            logging.warning(f"No valid moments for {icon_name} contour")
+            # Components come sorted by area, process the largest
+            components = segmentation.components(icon_name)
+            if components:
+                component = components[0]
+                area = component['area']
+                if area > 50:  # Minimum area threshold
+                    cX, cY = (int(c) for c in component['centroid'])
+                    position = (cX, cY)
+                    # Relax proximity check further if needed
+                    if position not in used_positions and all(
+                        np.sqrt((cX - up[0])**2 + (cY - up[1])**2) > 5 for up in used_positions
+                    ):
+                        icon_positions[icon_name] = position
+                        used_positions.add(position)
+                        logging.info(f"Detected {icon_name} at {position} (area: {area})")
                     else:
-                        logging.warning(f"Contour for {icon_name} too small (area: {cv2.contourArea(contour)})")
+                        logging.warning(f"Position for {icon_name} at {position} too close to another icon or already used (area: {area})")
+                else:
+                    logging.warning(f"Component for {icon_name} too small (area: {area})")
             else:
-                logging.warning(f"No contours found for {icon_name}")
+                logging.warning(f"No components found for {icon_name}")
 
         # Fallback for missing cart
         if "cart" not in icon_positions and "star" in icon_positions and "calendar" in icon_positions:
@@ -310,78 +348,69 @@ class CaptchaSolver:
                 logging.info(f"Assigned fallback position for cart at {position}")
 
         # Debug image with detected positions
-        debug_img = captcha_image.copy()
-        for icon_name, pos in icon_positions.items():
-            cv2.circle(debug_img, pos, 5, (0, 255, 0), -1)
-            cv2.putText(debug_img, icon_name, (pos[0] + 10, pos[1]), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
-        cv2.imwrite(os.path.join(CAPTCHA_IMAGE_DIR, "debug_icon_positions.png"), debug_img)
-
+        if debug:
+            debug_img = captcha_image.copy()
+            for icon_name, pos in icon_positions.items():
+                cv2.circle(debug_img, pos, 5, (0, 255, 0), -1)
+                cv2.putText(debug_img, icon_name, (pos[0] + 10, pos[1]), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+            DEBUG_SINK.write("debug_icon_positions.png", debug_img)
+
+        RESULT_CACHE.put(cache_key, icon_positions)
         return icon_positions
   
-    def preprocess_image(self, image):
+    def preprocess_image(self, image, debug=None):
         if len(image.shape) != 3:
             logging.error("Image is not a color image")
-            return {"star": np.zeros(image.shape, dtype=np.uint8),
-                    "calendar": np.zeros(image.shape, dtype=np.uint8),
-                    "cart": np.zeros(image.shape, dtype=np.uint8)}
-
-        # Convert hex colors to BGR (OpenCV format)
-        hex_to_bgr = {
-            "14ffd5": (213, 255, 20),  # #14FFD5 -> BGR: (20, 255, 213)
-            "00e0ff": (255, 224, 0),   # #00E0FF -> BGR: (255, 224, 0)
-            "6666ff": (255, 102, 102)  # #6666FF -> BGR: (255, 102, 102)
-        }
-
-        # Convert to HSV for color-based detection
-        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-        
-        # Define precise HSV ranges for each icon
-        icon_hsv_ranges = {
-            "cart": ([82, 80, 80], [88, 255, 255]),      # #14FFD5 (H: ~85)
-            "star": ([88, 80, 80], [94, 255, 255]),      # #00E0FF (H: ~91)
-            "calendar": ([115, 80, 80], [125, 255, 255]) # #6666FF (H: ~120)
-        }
-
-        icon_masks = {}
-        for icon_name, (lower, upper) in icon_hsv_ranges.items():
-            lower = np.array(lower, dtype=np.uint8)
-            upper = np.array(upper, dtype=np.uint8)
-            mask = cv2.inRange(hsv, lower, upper)
-            # Use a small kernel for subtle noise reduction
-            kernel = np.ones((2, 2), np.uint8)
-            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel, iterations=1)
-            mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel, iterations=1)
-            icon_masks[icon_name] = mask
-            logging.info(f"Processed mask for {icon_name}, min: {np.min(mask)}, max: {np.max(mask)}")
-
-        # Save combined mask for debugging
-        combined_mask = np.zeros_like(icon_masks["star"])
-        for mask in icon_masks.values():
-            combined_mask = cv2.bitwise_or(combined_mask, mask)
-        cv2.imwrite(os.path.join(CAPTCHA_IMAGE_DIR, "debug_combined_mask.png"), combined_mask)
-
-        # Save individual masks for debugging
-        for icon_name, mask in icon_masks.items():
-            cv2.imwrite(os.path.join(CAPTCHA_IMAGE_DIR, f"debug_mask_{icon_name}.png"), mask)
-
-        return icon_masks
+            return None
+
+        # One lookup-table pass labels every pixel with its icon colour
+        segmentation = ICON_SEGMENTER.segment(image)
+
+        # The masks are only built for the sampled debug output
+        if debug is None:
+            debug = DEBUG_SINK.sample()
+        if debug:
+            icon_masks = {icon_name: segmentation.mask(icon_name) for icon_name in ICON_HSV_RANGES}
+            for icon_name, mask in icon_masks.items():
+                logging.info(f"Processed mask for {icon_name}, min: {np.min(mask)}, max: {np.max(mask)}")
+
+            # Save combined mask for debugging
+            combined_mask = cv2.compare(segmentation.bits, 0, cv2.CMP_NE)
+            DEBUG_SINK.write("debug_combined_mask.png", combined_mask)
+
+            # Save individual masks for debugging
+            for icon_name, mask in icon_masks.items():
+                DEBUG_SINK.write(f"debug_mask_{icon_name}.png", mask)
+
+        return segmentation
+
     def extract_background_image_url(self, style):
         match = re.search(r"background-image:\s*url\(['\"]?(.*?)['\"]?\)", style)
         return match.group(1) if match else None
 
     def download_captcha_image(self, image_url):
+        # requests is only needed here, so it is not loaded at startup
+        import requests
+
         try:
             response = requests.get(image_url)
             if response.status_code == 200:
-                captcha_image_path = os.path.join(CAPTCHA_IMAGE_DIR, f"captcha_{int(time.time())}.png")
-                with open(captcha_image_path, "wb") as f:
-                    f.write(response.content)
-                logging.info(f"CAPTCHA image saved to {captcha_image_path}")
-                return captcha_image_path
+                return response.content
         except Exception as e:
             logging.error(f"Failed to download CAPTCHA image: {e}")
         return None
 
+    def archive_captcha_image(self, image_bytes):
+        # The downloaded bytes are written as they are, without re-encoding
+        captcha_image_path = os.path.join(CAPTCHA_IMAGE_DIR, f"captcha_{int(time.time())}.png")
+        try:
+            with open(captcha_image_path, "wb") as f:
+                f.write(image_bytes)
+            logging.info(f"CAPTCHA image saved to {captcha_image_path}")
+        except OSError as e:
+            logging.error(f"Failed to archive CAPTCHA image: {e}")
+        return captcha_image_path
+
 
 
 
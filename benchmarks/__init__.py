@@ -0,0 +1,13 @@
+"""
+Offline benchmarks over the sample images shipped with the repository.
+
+Run them from the repository root, e.g. ``python -m benchmarks.puzzle_pyramid``.
+"""
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def sample_path(*parts):
+    """Absolute path of a file shipped at the repository root."""
+    return os.path.join(ROOT, *parts)
@@ -0,0 +1,101 @@
+"""
+Replay the icon samples from PNG files and from a packed corpus.
+
+    python -m benchmarks.corpus_replay [--copies N] [--repeat N]
+
+The samples are copied `--copies` times into a temporary directory and
+packed into a corpus, then three passes go over the whole set: decoding
+only, decoding plus order_icons, and decoding plus the solver's
+detect_icons, best of `--repeat`. The corpus passes get their images as
+memmap views and decode nothing.
+"""
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks import ROOT, sample_path
+from benchmarks.suite import stub_selenium
+from vision.corpus import ImageCorpus, pack_images
+from vision.icons import get_template_bank, order_icons
+from vision.puzzle import read_image
+
+SAMPLES = ["received_icon.png", "captcha.png"]
+
+
+def best_rate(func, count, repeat):
+    """Best images/sec of `func` over `repeat` passes of `count` images."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return count / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--copies", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ["CAPTCHA_DEBUG_SAMPLE_RATE"] = "0"
+    stub_selenium()
+    import automate_captcha
+    from vision.result_cache import ResultCache
+
+    # Template paths are relative to the repository root
+    os.chdir(ROOT)
+    automate_captcha.RESULT_CACHE = ResultCache(max_entries=0)
+    # captcha.png has no colour icons, the solver warns on every pass
+    logging.getLogger().setLevel(logging.ERROR)
+    solver = automate_captcha.CaptchaSolver(driver=None)
+    icon_order = list(automate_captcha.ICON_HSV_RANGES)
+    bank = get_template_bank()
+
+    directory = tempfile.mkdtemp()
+    try:
+        paths = []
+        for copy in range(args.copies):
+            for sample in SAMPLES:
+                path = os.path.join(directory, f"{copy:04d}_{sample}")
+                shutil.copyfile(sample_path(sample), path)
+                paths.append(path)
+        corpus_path = os.path.join(directory, "samples.corpus")
+        start = time.perf_counter()
+        pack_images(paths, corpus_path)
+        print(f"{len(paths)} images packed in {time.perf_counter() - start:.2f} s, "
+              f"{os.path.getsize(corpus_path) / 2**20:.1f} MiB "
+              f"vs {sum(map(os.path.getsize, paths)) / 2**20:.1f} MiB of PNG")
+        corpus = ImageCorpus(corpus_path)
+
+        def replay(source, work):
+            return lambda: [work(image) for image in source()]
+
+        sources = {
+            "png": lambda: (read_image(path) for path in paths),
+            "corpus": lambda: (image for _, image in corpus),
+        }
+        works = {
+            "decode": lambda image: image,
+            "order_icons": lambda image: order_icons(
+                image, confidence_threshold=0.1, bank=bank),
+            "detect_icons": lambda image: solver.detect_icons(image, icon_order),
+        }
+        print(f"{'pass':14s} {'png/s':>9s} {'corpus/s':>9s} {'speedup':>8s}")
+        for name, work in works.items():
+            rates = {source: best_rate(replay(images, work), len(paths), args.repeat)
+                     for source, images in sources.items()}
+            print(f"{name:14s} {rates['png']:9.1f} {rates['corpus']:9.1f} "
+                  f"{rates['corpus'] / rates['png']:7.2f}x")
+    finally:
+        shutil.rmtree(directory)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
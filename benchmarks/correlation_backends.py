@@ -0,0 +1,65 @@
+"""
+Compare the normalized cross-correlation backends across template/image size ratios.
+
+    python -m benchmarks.correlation_backends [--repeat N] [--ratios R ...]
+
+For every image size the template is a centred crop whose sides are `ratio`
+times the image sides. "fft prepared" is the fft backend with the image
+spectrum and integral images computed once and reused, as order_icons does
+for the icon templates; it only counts the per-template cost.
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks import sample_path
+from vision.correlation import BACKENDS, PreparedImage
+
+SIZES = [(160, 316), (500, 632)]
+
+
+def time_call(func, repeat):
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--ratios", type=float, nargs="+",
+                        default=[0.05, 0.1, 0.15, 0.2, 0.3, 0.4, 0.5, 0.6, 0.8])
+    args = parser.parse_args()
+
+    edges = cv2.Canny(cv2.imread(sample_path("received_puzzle.png")), 100, 200)
+    names = sorted(BACKENDS)
+    for height, width in SIZES:
+        image = cv2.resize(edges, (width, height), interpolation=cv2.INTER_NEAREST)
+        prepared = PreparedImage(image)
+        print(f"image {width}x{height}")
+        print(f"  {'ratio':>5s} {'template':>9s}  "
+              + "  ".join(f"{name:>8s}" for name in names)
+              + f"  {'fft prepared':>12s}  winner")
+        for ratio in args.ratios:
+            th, tw = max(1, int(height * ratio)), max(1, int(width * ratio))
+            y, x = (height - th) // 2, (width - tw) // 2
+            template = np.ascontiguousarray(image[y:y + th, x:x + tw])
+            times = {name: time_call(lambda: BACKENDS[name](image, template), args.repeat)
+                     for name in names}
+            prepared_template = prepared.prepare(template)
+            prepared_ms = time_call(lambda: prepared.match(prepared_template), args.repeat)
+            diff = np.abs(BACKENDS["opencv"](image, template)
+                          - BACKENDS["fft"](image, template)).max()
+            winner = min({**times, "fft prepared": prepared_ms}.items(),
+                         key=lambda item: item[1])[0]
+            print(f"  {ratio:5.2f} {tw:4d}x{th:<4d}  "
+                  + "  ".join(f"{times[name]:8.2f}" for name in names)
+                  + f"  {prepared_ms:12.2f}  {winner}  (max diff {diff:.1e})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Time each preprocessing pipeline of vision.icons and show its match scores.
+
+    python -m benchmarks.icon_preprocess [--repeat N] [--pipelines NAME ...]
+"""
+import argparse
+import os
+
+from benchmarks import ROOT, sample_path
+from vision import icons
+from vision.puzzle import read_image
+
+SAMPLES = ["received_icon.png", "captcha.png"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--threshold", type=float, default=0.1)
+    parser.add_argument("--pipelines", nargs="+", default=list(icons.PIPELINES))
+    args = parser.parse_args()
+
+    # The default template paths are relative to the repository root
+    os.chdir(ROOT)
+    for sample in SAMPLES:
+        image = read_image(sample_path(sample))
+        print(sample)
+        for pipeline in args.pipelines:
+            bank = icons.get_template_bank(pipeline=pipeline)
+            timings = {}
+            for _ in range(args.repeat):
+                icons.preprocess_image(image, pipeline, timings)
+            stages = "  ".join(f"{stage}={ms / args.repeat:.2f}"
+                               for stage, ms in timings.items())
+            total = sum(timings.values()) / args.repeat
+            try:
+                order, scores = icons.order_icons(
+                    sample_path(sample), confidence_threshold=args.threshold, bank=bank)
+                found = " ".join(f"{name}:{score:.2f}" for name, score in zip(order, scores))
+            except ValueError as e:
+                found = str(e)
+            print(f"  {pipeline:10s} {total:8.2f} ms  [{stages}]  {found}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Compare the per-class inRange/contour loop with the one-pass HueSegmenter.
+
+    python -m benchmarks.icon_segmentation [--repeat N]
+
+Besides the captcha samples, a synthetic image has a cart-coloured and a
+star-coloured block touching each other, which must stay two components.
+Every component (area, centroid and box) of every class is compared, and
+the script exits with status 1 if the two disagree.
+"""
+import argparse
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks import sample_path
+from automate_captcha import ICON_HSV_RANGES, ICON_SEGMENTER
+
+SAMPLES = ["received_icon.png", "captcha.png"]
+KERNEL = np.ones((2, 2), np.uint8)
+
+
+def touching_icons():
+    """Grey image with a cart-coloured block right next to a star-coloured one."""
+    image = np.full((120, 160, 3), 40, np.uint8)
+    image[40:80, 30:80] = (213, 255, 20)   # #14FFD5, cart
+    image[40:80, 80:130] = (255, 224, 0)   # #00E0FF, star
+    return image
+
+
+def per_class(image):
+    """The detection loop as it was: one mask and one contour pass per icon."""
+    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    components = {}
+    for name, (lower, upper) in ICON_HSV_RANGES.items():
+        mask = cv2.inRange(hsv, np.array(lower, np.uint8), np.array(upper, np.uint8))
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, KERNEL, iterations=1)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, KERNEL, iterations=1)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        contours = sorted(contours, key=cv2.contourArea, reverse=True)
+        components[name] = []
+        for contour in contours:
+            moments = cv2.moments(contour)
+            if cv2.contourArea(contour) > 50:
+                components[name].append(
+                    (int(moments["m10"] / moments["m00"]), int(moments["m01"] / moments["m00"]),
+                     cv2.contourArea(contour), cv2.boundingRect(contour)))
+    return components
+
+
+def one_pass(image):
+    segmentation = ICON_SEGMENTER.segment(image)
+    return {name: [(int(component["centroid"][0]), int(component["centroid"][1]),
+                    component["area"], component["box"])
+                   for component in segmentation.components(name, min_area=50)]
+            for name in ICON_HSV_RANGES}
+
+
+def positions(components):
+    """Centroid of the largest component of every class, as detect_icons clicks it."""
+    return {name: found[0][:2] for name, found in components.items() if found}
+
+
+def measure(func, image, repeat):
+    result = func(image)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(image)
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    samples = {sample: cv2.imread(sample_path(sample)) for sample in SAMPLES}
+    samples["touching icons"] = touching_icons()
+    failed = False
+    for sample, image in samples.items():
+        base, base_ms = measure(per_class, image, args.repeat)
+        new, new_ms = measure(one_pass, image, args.repeat)
+        same = base == new
+        failed |= not same
+        print(sample)
+        print(f"  per-class loop  {base_ms:7.2f} ms  {positions(base)}")
+        print(f"  HueSegmenter    {new_ms:7.2f} ms  {positions(new)}  x{base_ms / new_ms:.2f}  "
+              f"same components: {same}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Compare the icon matching backends, and the early exit over the scales.
+
+    python -m benchmarks.icon_templates [--repeat N]
+
+Every icon of every sample is matched at all scales with cv2.matchTemplate,
+then by find_icons with the early exit order_icons uses, with each
+correlation backend. Besides the captcha samples, icon.png is also matched
+inside a flat grey border, whose constant windows OpenCV scores 0. The
+script exits with status 1 if a backend disagrees with matchTemplate on a
+position or a score.
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+
+from benchmarks import ROOT, sample_path
+from vision import icons
+from vision.correlation import BACKENDS
+from vision.puzzle import read_image
+
+SAMPLES = ["received_icon.png", "captcha.png"]
+
+# Grey level and width of the flat border around icon.png
+FLAT_BORDER = (30, 60)
+
+
+def load_samples():
+    """Sample name -> captcha image, the flat-border case included."""
+    samples = {sample: read_image(sample_path(sample)) for sample in SAMPLES}
+    grey, width = FLAT_BORDER
+    samples["icon.png in a flat border"] = cv2.copyMakeBorder(
+        read_image(sample_path("icon.png")), width, width, width, width,
+        cv2.BORDER_CONSTANT, value=(grey, grey, grey))
+    return samples
+
+
+def all_scales(bank, names, image, threshold):
+    return {name: icons.find_scaled_icon(bank.templates(name, image.shape), image, threshold)
+            for name in names}
+
+
+def measure(func, repeat):
+    result = func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--threshold", type=float, default=0.1)
+    parser.add_argument("--early-exit", type=float, default=0.95)
+    args = parser.parse_args()
+
+    # The default template paths are relative to the repository root
+    os.chdir(ROOT)
+    bank = icons.get_template_bank()
+    names = list(icons.DEFAULT_ICON_FILEPATHS)
+    failed = False
+    for sample, captcha in load_samples().items():
+        image = icons.preprocess_image(captcha)
+        base, base_ms = measure(lambda: all_scales(bank, names, image, args.threshold),
+                                args.repeat)
+        print(f"{sample}")
+        print(f"  matchTemplate, all scales   {base_ms:8.2f} ms")
+        for backend in sorted(BACKENDS):
+            result, ms = measure(
+                lambda: icons.find_icons(bank, names, image, args.threshold,
+                                         args.early_exit, backend), args.repeat)
+            same = all(base[name][0] == result[name][0]
+                       and abs(base[name][1] - result[name][1]) < 1e-4 for name in names)
+            failed |= not same
+            print(f"  {backend + ', early exit':26s}  {ms:8.2f} ms  "
+                  f"x{base_ms / ms:.2f}  same matches: {same}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
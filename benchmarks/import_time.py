@@ -0,0 +1,85 @@
+"""
+Measure the import time of the vision package, the solver and the GUI.
+
+    python -m benchmarks.import_time [--repeat N] [--check]
+
+Every module is imported in a fresh interpreter, best of N. The vision
+modules are budgeted on top of the floor that ``import cv2, numpy`` costs on
+this machine, since the matching core cannot avoid those two; the GUI must
+start without them. With --check the script exits with status 1 if a module
+goes over its budget or loads one of the heavy modules it must leave alone.
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+from benchmarks import ROOT
+
+FLOOR = "cv2, numpy"
+
+# Module -> (FLOOR if the budget is on top of the floor, None if it is
+# absolute; budget in ms, None for none; modules the import must not load)
+HEAVY = ["PIL", "bs4", "requests", "matplotlib", "selenium", "sqlite3",
+         "concurrent.futures"]
+TARGETS = {
+    "vision": (None, 30, HEAVY + ["cv2", "numpy"]),
+    "vision.puzzle": (FLOOR, 40, HEAVY),
+    "vision.icons": (FLOOR, 40, HEAVY),
+    "vision.segmentation": (FLOOR, 30, HEAVY),
+    "automate_captcha": (FLOOR, None, ["PIL", "bs4", "requests", "matplotlib"]),
+    "gui": (None, 150, ["cv2", "numpy", "selenium", "automate_captcha"]),
+}
+
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"ms": elapsed * 1000, "modules": sorted(sys.modules)}}))
+"""
+
+
+def measure(module, repeat):
+    """Best import time of `module` in ms and the modules it left loaded."""
+    best, modules = None, []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", SCRIPT.format(module=module)],
+            cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        if best is None or result["ms"] < best:
+            best, modules = result["ms"], result["modules"]
+    return best, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--check", action="store_true",
+                        help="Fail on a budget overrun or a heavy module being loaded.")
+    args = parser.parse_args()
+
+    floor_ms, _ = measure(FLOOR, args.repeat)
+    print(f"floor: import {FLOOR:24s} {floor_ms:8.1f} ms")
+    failed = False
+    for module, (base, budget, forbidden) in TARGETS.items():
+        ms, modules = measure(module, args.repeat)
+        extra = ms - floor_ms if base else ms
+        loaded = [name for name in forbidden if name in modules]
+        if budget is None:
+            status = ""
+        else:
+            over = extra > budget
+            status = f"budget {budget:4d} ms {'OVER' if over else 'ok'}"
+            failed |= over
+        label = f"+{extra:6.1f} ms over floor" if base else f"{extra:7.1f} ms"
+        print(f"  {module:20s} {ms:8.1f} ms  {label:22s} {status}")
+        if loaded:
+            print(f"    loads {', '.join(loaded)}")
+            failed = True
+    return 1 if args.check and failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
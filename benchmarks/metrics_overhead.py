@@ -0,0 +1,58 @@
+"""
+Measure what the metrics spans cost when disabled and when enabled.
+
+    python -m benchmarks.metrics_overhead [--repeat N] [--spans N]
+"""
+import argparse
+import time
+
+from benchmarks import sample_path
+from vision.metrics import METRICS, Metrics
+from vision.puzzle import GeeTestIdentifier
+
+
+def per_call_ns(func, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        func()
+    return (time.perf_counter() - start) / count * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--spans", type=int, default=200000)
+    args = parser.parse_args()
+
+    def empty():
+        pass
+
+    def timed_span(metrics):
+        def func():
+            with metrics.span("stage"):
+                pass
+        return func
+
+    base = per_call_ns(empty, args.spans)
+    off = per_call_ns(timed_span(Metrics(enabled=False)), args.spans)
+    on = per_call_ns(timed_span(Metrics(enabled=True)), args.spans)
+    print(f"empty call           {base:8.0f} ns")
+    print(f"span, disabled       {off:8.0f} ns  (+{off - base:.0f} ns)")
+    print(f"span, enabled        {on:8.0f} ns  (+{on - base:.0f} ns)")
+
+    identifier = GeeTestIdentifier(sample_path("received_puzzle.png"),
+                                   sample_path("templates/piece.png"))
+    enabled = METRICS.enabled
+    try:
+        for state in (False, True):
+            METRICS.enabled = state
+            identifier.find_puzzle_piece_position()
+            ms = per_call_ns(identifier.find_puzzle_piece_position, args.repeat) / 1e6
+            print(f"puzzle search, metrics {'on ' if state else 'off'} {ms:8.2f} ms")
+    finally:
+        METRICS.enabled = enabled
+        METRICS.reset()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Measure the allocations of repeated puzzle searches with and without a PuzzleMatcher.
+
+    python -m benchmarks.puzzle_matcher [--repeat N] [--check] [--limit KIB]
+
+Peak is the most memory tracemalloc sees allocated at once during one
+warmed-up search: NumPy buffers, including the ones OpenCV returns, but not
+OpenCV's internal scratch memory. With --check the script exits with status 1
+if a search with a warmed-up matcher peaks above --limit KiB, far below the
+size of a single edge or response map.
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+
+from benchmarks import sample_path
+from vision.puzzle import GeeTestIdentifier, PuzzleMatcher
+
+SAMPLES = [
+    ("received_puzzle.png", "templates/piece.png"),
+    ("input.png", "templates/piece.png"),
+]
+
+
+def peak_kib(func):
+    """Peak KiB allocated during one call of `func`."""
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--check", action="store_true",
+                        help="Fail if a warmed-up matcher allocates more than --limit.")
+    parser.add_argument("--limit", type=float, default=64.0, help="KiB, for --check.")
+    args = parser.parse_args()
+
+    failed = False
+    for background, piece in SAMPLES:
+        fresh = GeeTestIdentifier(sample_path(background), sample_path(piece))
+        reused = GeeTestIdentifier(sample_path(background), sample_path(piece),
+                                   matcher=PuzzleMatcher())
+        assert (fresh.find_puzzle_piece_position()
+                == reused.find_puzzle_piece_position()), "results differ"
+
+        print(f"{background} + {piece}")
+        for name, identifier in [("new buffers", fresh), ("PuzzleMatcher", reused)]:
+            identifier.find_puzzle_piece_position()
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                identifier.find_puzzle_piece_position()
+            ms = (time.perf_counter() - start) / args.repeat * 1000
+            peak = peak_kib(identifier.find_puzzle_piece_position)
+            print(f"  {name:14s} {ms:8.2f} ms  peak {peak:8.1f} KiB")
+            if identifier is reused and args.check and peak > args.limit:
+                print(f"  FAIL: peak {peak:.1f} KiB, limit {args.limit:.1f} KiB")
+                failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
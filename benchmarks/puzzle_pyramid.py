@@ -0,0 +1,144 @@
+"""
+Compare the exhaustive puzzle search with the coarse-to-fine pyramid mode.
+
+    python -m benchmarks.puzzle_pyramid [--repeat N] [--levels L ...] [--radius R]
+                                        [--sliders N]
+
+Two sets of cases. The bundled 632x500 samples, matched with
+templates/piece.png. And `--sliders` synthetic slider puzzles at the size
+the solver sees: a piece cut out of a 316x160 crop of a bundled image, a
+darkened and outlined hole where it was, and the piece on a transparent
+64x160 canvas as tall as the background, matched whole ("canvas") and
+cropped to its rows ("piece").
+
+Exits with status 1 if any pyramid level finds another position than the
+exhaustive search.
+"""
+import argparse
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks import sample_path
+from vision.puzzle import GeeTestIdentifier
+
+SAMPLES = [
+    ("received_puzzle.png", "templates/piece.png"),
+    ("input.png", "templates/piece.png"),
+]
+
+SLIDER_SOURCES = ["received_puzzle.png", "captcha.png", "received_icon.png", "error_0.png"]
+SLIDER_SIZE = (316, 160)
+SLIDER_CANVAS_WIDTH = 64
+SLIDER_PIECE_SIDE = 42
+# Horizontal position of the piece on its canvas
+SLIDER_PIECE_OFFSET = 6
+
+
+def slider_puzzles(count, seed=0):
+    """
+    `count` synthetic (background, canvas, piece) slider puzzles and the x
+    of the canvas center when it sits on the hole.
+    """
+    rng = np.random.default_rng(seed)
+    sources = [cv2.imread(sample_path(name)) for name in SLIDER_SOURCES]
+    width, height = SLIDER_SIZE
+    side = SLIDER_PIECE_SIDE
+    puzzles = []
+    for index in range(count):
+        source = sources[index % len(sources)]
+        scale = rng.uniform(0.6, 1.0)
+        crop_h, crop_w = int(source.shape[0] * scale), int(source.shape[1] * scale)
+        y = rng.integers(0, source.shape[0] - crop_h + 1)
+        x = rng.integers(0, source.shape[1] - crop_w + 1)
+        image = cv2.resize(source[y:y + crop_h, x:x + crop_w], SLIDER_SIZE,
+                           interpolation=cv2.INTER_AREA)
+
+        # A square piece with a knob on its right side
+        hole_x = int(rng.integers(SLIDER_CANVAS_WIDTH + 10, width - side - 12))
+        hole_y = int(rng.integers(8, height - side - 8))
+        mask = np.zeros((height, width), np.uint8)
+        cv2.rectangle(mask, (hole_x, hole_y), (hole_x + side - 1, hole_y + side - 1), 255, -1)
+        cv2.circle(mask, (hole_x + side, hole_y + side // 2), 7, 255, -1)
+        outline, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        canvas_x = hole_x - SLIDER_PIECE_OFFSET
+        canvas = np.zeros((height, SLIDER_CANVAS_WIDTH, 3), np.uint8)
+        columns = slice(canvas_x, canvas_x + SLIDER_CANVAS_WIDTH)
+        np.copyto(canvas, image[:, columns], where=mask[:, columns, None] > 0)
+        cv2.drawContours(canvas, [contour - [canvas_x, 0] for contour in outline],
+                         -1, (255, 255, 255), 1)
+        rows = np.flatnonzero(canvas.any(axis=(1, 2)))
+        piece = canvas[rows[0]:rows[-1] + 1]
+
+        background = image.copy()
+        background[mask > 0] = (background[mask > 0] * 0.4).astype(np.uint8)
+        cv2.drawContours(background, outline, -1, (230, 230, 230), 1)
+        puzzles.append((background, canvas, piece, canvas_x + SLIDER_CANVAS_WIDTH // 2))
+    return puzzles
+
+
+def time_call(identifier, repeat, **kwargs):
+    result = identifier.find_puzzle_piece_position(**kwargs)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        identifier.find_puzzle_piece_position(**kwargs)
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--radius", type=int, default=8)
+    parser.add_argument("--sliders", type=int, default=30)
+    args = parser.parse_args()
+
+    mismatches = 0
+    for background, piece in SAMPLES:
+        identifier = GeeTestIdentifier(sample_path(background), sample_path(piece))
+        base, base_ms = time_call(identifier, args.repeat)
+        print(f"{background} + {piece}")
+        print(f"  exhaustive   {base_ms:8.2f} ms  {base['coordinates']}  "
+              f"conf={base['confidence']:.3f}")
+        for levels in args.levels:
+            result, ms = time_call(identifier, args.repeat,
+                                   pyramid_levels=levels, refine_radius=args.radius)
+            same = "same" if result["coordinates"] == base["coordinates"] else "DIFFERENT"
+            mismatches += same != "same"
+            print(f"  pyramid L={levels}  {ms:8.2f} ms  {result['coordinates']}  "
+                  f"conf={result['confidence']:.3f}  x{base_ms / ms:.1f}  {same}")
+
+    if args.sliders:
+        puzzles = slider_puzzles(args.sliders)
+        repeat = max(1, args.repeat // 4)
+        for name, template in [("canvas", 1), ("piece", 2)]:
+            found = 0
+            total_ms = dict.fromkeys([0] + args.levels, 0.0)
+            different = dict.fromkeys(args.levels, 0)
+            for puzzle in puzzles:
+                identifier = GeeTestIdentifier(puzzle[0], puzzle[template])
+                base, ms = time_call(identifier, repeat)
+                total_ms[0] += ms
+                found += abs(base["coordinates"][0] - puzzle[3]) <= 2
+                for levels in args.levels:
+                    result, ms = time_call(identifier, repeat, pyramid_levels=levels,
+                                           refine_radius=args.radius)
+                    total_ms[levels] += ms
+                    different[levels] += result["coordinates"] != base["coordinates"]
+            shape = puzzles[0][template].shape
+            print(f"{len(puzzles)} slider puzzles, {shape[1]}x{shape[0]} {name}")
+            print(f"  exhaustive   {total_ms[0] / len(puzzles):8.2f} ms  "
+                  f"hole found in {found}")
+            for levels in args.levels:
+                mismatches += different[levels]
+                same = f"{different[levels]} DIFFERENT" if different[levels] else "same"
+                print(f"  pyramid L={levels}  {total_ms[levels] / len(puzzles):8.2f} ms  "
+                      f"x{total_ms[0] / total_ms[levels]:.1f}  {same}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
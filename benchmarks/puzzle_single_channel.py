@@ -0,0 +1,85 @@
+"""
+Compare the single-channel edge matching path with the old GRAY2RGB one.
+
+    python -m benchmarks.puzzle_single_channel [--repeat N]
+
+Peak memory is the tracemalloc peak, i.e. the NumPy buffers OpenCV hands back
+to Python; scratch memory inside OpenCV itself is not counted.
+"""
+import argparse
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from benchmarks import sample_path
+from vision.puzzle import GeeTestIdentifier
+
+SAMPLES = [
+    ("received_puzzle.png", "templates/piece.png"),
+    ("input.png", "templates/piece.png"),
+]
+
+
+def rgb_response(background, puzzle_piece):
+    """The matching path as it was before, with both edge maps made 3-channel."""
+    edge_puzzle_piece = cv2.cvtColor(cv2.Canny(puzzle_piece, 100, 200), cv2.COLOR_GRAY2RGB)
+    edge_background = cv2.cvtColor(cv2.Canny(background, 100, 200), cv2.COLOR_GRAY2RGB)
+    return cv2.matchTemplate(edge_background, edge_puzzle_piece, cv2.TM_CCOEFF_NORMED)
+
+
+def gray_response(background, puzzle_piece):
+    edge_puzzle_piece = cv2.Canny(puzzle_piece, 100, 200)
+    edge_background = cv2.Canny(background, 100, 200)
+    return cv2.matchTemplate(edge_background, edge_puzzle_piece, cv2.TM_CCOEFF_NORMED)
+
+
+def measure(func, repeat):
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    for background, piece in SAMPLES:
+        with open(sample_path(background), "rb") as f:
+            background_bytes = f.read()
+        with open(sample_path(piece), "rb") as f:
+            piece_bytes = f.read()
+        color = GeeTestIdentifier(background_bytes, piece_bytes)
+        gray = GeeTestIdentifier(background_bytes, piece_bytes, grayscale=True)
+
+        diff = np.abs(rgb_response(color.background, color.puzzle_piece)
+                      - gray_response(color.background, color.puzzle_piece)).max()
+        print(f"{background} + {piece}  (max |response diff| = {diff:.2e})")
+        rows = [
+            ("GRAY2RGB match", lambda: rgb_response(color.background, color.puzzle_piece)),
+            ("1-channel match", lambda: gray_response(color.background, color.puzzle_piece)),
+            ("decode + 1-channel",
+             lambda: GeeTestIdentifier(background_bytes, piece_bytes).find_puzzle_piece_position()),
+            ("gray decode + 1-channel",
+             lambda: GeeTestIdentifier(background_bytes, piece_bytes,
+                                       grayscale=True).find_puzzle_piece_position()),
+        ]
+        for name, func in rows:
+            ms, peak_kib = measure(func, args.repeat)
+            print(f"  {name:24s} {ms:8.2f} ms  peak {peak_kib:8.1f} KiB")
+        same = (color.find_puzzle_piece_position()["coordinates"]
+                == gray.find_puzzle_piece_position()["coordinates"])
+        print(f"  gray decode gives the same coordinates: {same}")
+
+
+if __name__ == "__main__":
+    main()
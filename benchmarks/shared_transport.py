@@ -0,0 +1,107 @@
+"""
+Compare pickled and shared-memory transport of decoded images to process workers.
+
+    python -m benchmarks.shared_transport [--count N] [--workers N]
+
+First the transport alone: `--count` images per size go to workers that
+only sum one row, so the time is spent moving pixels. Then the process
+batch modes end to end on decoded sample images, with and without
+shared_memory.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from benchmarks import ROOT, sample_path
+from vision.icons import batch_order_icons
+from vision.puzzle import GeeTestIdentifier, read_image
+from vision.transport import SharedImageRing, attach, collect_completed
+
+SIZES = [(252, 318, 3), (500, 632, 3), (1080, 1920, 3)]
+
+
+def _touch(image):
+    return int(attach(image)[0].sum())
+
+
+def transport_rate(images, workers, shared):
+    """Images/sec sent to `workers` processes that barely read them."""
+    # The ring goes first, so the workers share its resource tracker
+    ring = SharedImageRing(2 * workers) if shared else None
+    with ProcessPoolExecutor(workers) as pool:
+        # Start the workers before timing
+        list(pool.map(int, range(workers)))
+        start = time.perf_counter()
+        pending = {}
+        for image in images:
+            if len(pending) >= 2 * workers:
+                for _ in collect_completed(pending, ring):
+                    pass
+            if ring is not None:
+                image = ring.share(image)
+            pending[pool.submit(_touch, image)] = (image,)
+        while pending:
+            for _ in collect_completed(pending, ring):
+                pass
+        elapsed = time.perf_counter() - start
+    if ring is not None:
+        ring.close()
+    return len(images) / elapsed
+
+
+def batch_rate(run, count):
+    start = time.perf_counter()
+    records = list(run())
+    elapsed = time.perf_counter() - start
+    failed = sum("error" in record for record in records)
+    return count / elapsed, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    print(f"transport, {args.workers} workers")
+    print(f"  {'image':16s} {'pickled/s':>10s} {'shared/s':>10s} {'speedup':>8s}")
+    rng = np.random.default_rng(0)
+    for shape in SIZES:
+        images = [rng.integers(0, 256, shape, np.uint8) for _ in range(4)] * (args.count // 4)
+        pickled = transport_rate(images, args.workers, shared=False)
+        shared = transport_rate(images, args.workers, shared=True)
+        label = "x".join(map(str, shape))
+        print(f"  {label:16s} {pickled:10.1f} {shared:10.1f} {shared / pickled:7.2f}x")
+
+    # Template paths are relative to the repository root
+    os.chdir(ROOT)
+    background = read_image(sample_path("received_puzzle.png"))
+    piece = read_image(sample_path("templates/piece.png"))
+    captcha = read_image(sample_path("received_icon.png"))
+    count = args.count // 4
+    runs = {
+        "solve_batch": lambda shared: GeeTestIdentifier.solve_batch(
+            [(background, piece)] * count, workers=args.workers, executor="process",
+            shared_memory=shared),
+        "batch_order_icons": lambda shared: batch_order_icons(
+            [captcha] * count, workers=args.workers, executor="process",
+            confidence_threshold=0.1, shared_memory=shared),
+    }
+    print(f"end to end, {count} decoded images")
+    for name, run in runs.items():
+        rates = {}
+        for shared in (False, True):
+            rates[shared], failed = batch_rate(lambda: run(shared), count)
+            if failed:
+                print(f"  {name}: {failed} failed")
+        print(f"  {name:18s} pickled {rates[False]:7.1f}/s  shared {rates[True]:7.1f}/s  "
+              f"{rates[True] / rates[False]:5.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
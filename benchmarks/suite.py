@@ -0,0 +1,210 @@
+"""
+Latency and memory benchmark suite over the sample images, with an optional baseline.
+
+    python -m benchmarks.suite [--repeat N] [--cases NAME ...] [--save-baseline]
+                               [--baseline PATH] [--tolerance F]
+                               [--memory-tolerance F] [--json PATH]
+
+Every case runs once to warm up (template banks, buffers), then `--repeat`
+timed runs give p50/p95/p99, and one more run under tracemalloc gives the
+peak memory (NumPy buffers included, OpenCV scratch memory not).
+
+Baselines are machine specific, so none is shipped and nothing is compared
+by default. Record one on the machine the comparison runs on first:
+
+    python -m benchmarks.suite --save-baseline
+    python -m benchmarks.suite --baseline benchmarks/baseline.json
+
+--save-baseline writes the run to --baseline, or to benchmarks/baseline.json
+(ignored by git), replacing only the selected cases. With --baseline the run
+is compared with that file, and the script exits with status 1 when a
+case's p50 is more than `--tolerance` slower, or its peak memory more than
+`--memory-tolerance` larger, than recorded.
+
+selenium is replaced by empty stub modules before automate_captcha is
+imported, so the CaptchaSolver cases need neither a browser nor selenium.
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+import types
+
+from benchmarks import ROOT, sample_path
+
+# Where --save-baseline writes without --baseline
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baseline.json")
+
+SELENIUM_MODULES = {
+    "selenium": {},
+    "selenium.webdriver": {},
+    "selenium.webdriver.common": {},
+    "selenium.webdriver.common.by": {"By": object},
+    "selenium.webdriver.common.action_chains": {"ActionChains": object},
+    "selenium.webdriver.support": {},
+    "selenium.webdriver.support.ui": {"WebDriverWait": object},
+    "selenium.webdriver.support.expected_conditions": {},
+    "selenium.common": {},
+    "selenium.common.exceptions": {"TimeoutException": Exception},
+}
+
+
+def stub_selenium():
+    """Register empty selenium modules, the solver only needs them for the browser."""
+    for name, attributes in SELENIUM_MODULES.items():
+        module = types.ModuleType(name)
+        module.__dict__.update(attributes)
+        sys.modules[name] = module
+    for name in SELENIUM_MODULES:
+        parent, _, child = name.rpartition(".")
+        if parent:
+            setattr(sys.modules[parent], child, sys.modules[name])
+    sys.modules["selenium.webdriver.support"].expected_conditions = \
+        sys.modules["selenium.webdriver.support.expected_conditions"]
+
+
+def build_cases():
+    """Case name -> function running it once."""
+    # Debug output and result caching would skew the measurements
+    os.environ["CAPTCHA_DEBUG_SAMPLE_RATE"] = "0"
+    stub_selenium()
+    import automate_captcha
+    import icons2
+    from vision.icons import get_template_bank, order_icons
+    from vision.puzzle import GeeTestIdentifier
+    from vision.result_cache import ResultCache
+
+    automate_captcha.RESULT_CACHE = ResultCache(max_entries=0)
+    logging.getLogger().setLevel(logging.ERROR)
+    solver = automate_captcha.CaptchaSolver(driver=None)
+    bank = get_template_bank()
+    icon_order = list(automate_captcha.ICON_HSV_RANGES)
+
+    def read(name):
+        with open(sample_path(name), "rb") as f:
+            return f.read()
+
+    cases = {}
+    for background in ["received_puzzle.png", "input.png"]:
+        background_bytes, piece_bytes = read(background), read("templates/piece.png")
+        cases[f"puzzle/{background}"] = (
+            lambda b=background_bytes, p=piece_bytes:
+            GeeTestIdentifier(b, p).find_puzzle_piece_position())
+    for captcha in ["received_icon.png", "captcha.png"]:
+        path = sample_path(captcha)
+        cases[f"order_icons/{captcha}"] = (
+            lambda path=path: order_icons(path, confidence_threshold=0.1, bank=bank))
+        cases[f"icons2.detect_icons/{captcha}"] = (
+            lambda path=path: icons2.detect_icons(path))
+        cases[f"solver.detect_icons/{captcha}"] = (
+            lambda path=path: solver.detect_icons(path, icon_order))
+        image = automate_captcha.read_image(path)
+        cases[f"solver.preprocess_image/{captcha}"] = (
+            lambda image=image: solver.preprocess_image(image, debug=False))
+    return cases
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, max(0, int(q * len(ordered) + 0.5) - 1))]
+
+
+def run_case(func, repeat):
+    func()
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    durations.sort()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "p50_ms": percentile(durations, 0.5),
+        "p95_ms": percentile(durations, 0.95),
+        "p99_ms": percentile(durations, 0.99),
+        "peak_kib": peak / 1024,
+    }
+
+
+def compare(name, result, baseline, tolerance, memory_tolerance):
+    """Regression messages of `result` against the `baseline` entry."""
+    problems = []
+    if result["p50_ms"] > baseline["p50_ms"] * (1 + tolerance):
+        problems.append(f"p50 {result['p50_ms']:.2f} ms vs {baseline['p50_ms']:.2f} ms")
+    # A few KiB of slack keeps tiny allocations from flapping
+    if result["peak_kib"] > baseline["peak_kib"] * (1 + memory_tolerance) + 16:
+        problems.append(f"peak {result['peak_kib']:.0f} KiB vs {baseline['peak_kib']:.0f} KiB")
+    return [f"{name}: {problem}" for problem in problems]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--cases", nargs="+", help="Only run cases starting with these names.")
+    parser.add_argument("--baseline",
+                        help="Baseline file to compare with, or to save to with --save-baseline.")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Record this run as the baseline (benchmarks/baseline.json "
+                             "without --baseline).")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed p50 slowdown, as a fraction. The default is 0.25.")
+    parser.add_argument("--memory-tolerance", type=float, default=0.10,
+                        help="Allowed peak memory growth, as a fraction. The default is 0.10.")
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    # Template paths are relative to the repository root
+    os.chdir(ROOT)
+    cases = build_cases()
+    if args.cases:
+        cases = {name: func for name, func in cases.items()
+                 if any(name.startswith(prefix) for prefix in args.cases)}
+
+    baseline_path = args.baseline
+    if baseline_path is None and args.save_baseline:
+        baseline_path = BASELINE_PATH
+    baseline = {}
+    if baseline_path is not None and os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+    elif args.baseline is not None and not args.save_baseline:
+        parser.error(f"No baseline at {args.baseline}; record one with --save-baseline.")
+
+    results, problems = {}, []
+    print(f"{'case':42s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'peak KiB':>9s}  vs baseline p50")
+    for name, func in cases.items():
+        # icons2 prints its positions
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = run_case(func, args.repeat)
+        results[name] = result
+        reference = baseline.get(name)
+        change = (f"{result['p50_ms'] / reference['p50_ms'] - 1:+7.1%}"
+                  if reference else "      -")
+        print(f"{name:42s} {result['p50_ms']:8.2f} {result['p95_ms']:8.2f} "
+              f"{result['p99_ms']:8.2f} {result['peak_kib']:9.0f}  {change}")
+        if reference and not args.save_baseline:
+            problems += compare(name, result, reference, args.tolerance, args.memory_tolerance)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(baseline_path, "w") as f:
+            json.dump({**baseline, **results}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline saved to {baseline_path}")
+        return 0
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
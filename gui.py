@@ -1,9 +1,10 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
-from automate_captcha import CaptchaSolver  # We only need CaptchaSolver now
 import webbrowser
-from selenium import webdriver
+
+# selenium and the solver (OpenCV, NumPy) are imported when first needed, so
+# the window shows up without waiting for them
 
 class CaptchaSolverGUI:
     def __init__(self, root):
@@ -51,6 +52,8 @@ class CaptchaSolverGUI:
         url = ("https://faucetpay.io/account/register" if action == "Register" 
                else "https://faucetpay.io/account/login")
         
+        from selenium import webdriver
+
         self.driver = webdriver.Chrome()
         self.driver.get(url)
         self.status_label.config(text=f"Opened {action} page")
@@ -75,6 +78,8 @@ class CaptchaSolverGUI:
             # Click the "I'm not a robot" checkbox
             # self.driver.find_element(tk.By.XPATH, "//div[span[text()=\"I'm not a robot\"]]").click()
 
+            from automate_captcha import CaptchaSolver
+
             solver = CaptchaSolver(self.driver)
             
             # Attempt to solve slider CAPTCHA if present
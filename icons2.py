@@ -1,6 +1,7 @@
 import cv2
 import numpy as np
-import matplotlib.pyplot as plt
+
+from vision.segmentation import HueSegmenter
 
 def load_image(image_path):
     image = cv2.imread(image_path)
@@ -13,40 +14,48 @@ def get_color_ranges():
         "calendar": {"lower": np.array([120, 150, 200]), "upper": np.array([130, 255, 255])},  # Bleu (#6464fb)
     }
 
-def detect_color(mask_color_name, hsv_image, lower_bound, upper_bound, image):
-    mask = cv2.inRange(hsv_image, lower_bound, upper_bound)
-    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    positions = []
-    for contour in contours:
-        x, y, w, h = cv2.boundingRect(contour)
-        if w > 10 and h > 10:  # Éliminer les petits bruits
-            center_x, center_y = x + w // 2, y + h // 2
-            positions.append(center_x)
-            positions.append(center_y)
-            cv2.rectangle(image, (x, y), (x + w, y + h), (0, 255, 0), 2)
-            cv2.circle(image, (center_x, center_y), 5, (0, 0, 255), -1)
-            cv2.putText(
-                image,
-                mask_color_name,
-                (x, y - 10),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5,
-                (0, 255, 0),
-                1,
-            )
-        print(positions)
-    return positions
+def get_segmenter():
+    return HueSegmenter({
+        name: (color_range["lower"], color_range["upper"])
+        for name, color_range in get_color_ranges().items()
+    })
+
+def draw_icon(image, name, box):
+    x, y, w, h = box
+    center_x, center_y = x + w // 2, y + h // 2
+    cv2.rectangle(image, (x, y), (x + w, y + h), (0, 255, 0), 2)
+    cv2.circle(image, (center_x, center_y), 5, (0, 0, 255), -1)
+    cv2.putText(
+        image,
+        name,
+        (x, y - 10),
+        cv2.FONT_HERSHEY_SIMPLEX,
+        0.5,
+        (0, 255, 0),
+        1,
+    )
+    return center_x, center_y
 
 def detect_icons(image_path):
     image_hsv, image = load_image(image_path)
-    color_ranges = get_color_ranges()
+    # All colours are labelled in a single pass over the HSV image
+    segmentation = get_segmenter().segment(image_hsv, hsv=True)
     icon_positions = {}
-    for icon_name, color_range in color_ranges.items():
-        positions = detect_color(icon_name, image_hsv, color_range["lower"], color_range["upper"], image)
+    for icon_name in segmentation.names:
+        positions = []
+        # Every contour, in the order cv2.findContours gives them
+        for component in segmentation.components(icon_name, min_area=-1, largest_first=False):
+            x, y, w, h = component["box"]
+            if w > 10 and h > 10:  # Éliminer les petits bruits
+                positions.extend(draw_icon(image, icon_name, component["box"]))
+        print(positions)
         icon_positions[icon_name] = positions
     return image, icon_positions
 
 def display_image(image):
+    # Only needed to show the result, and slow to import
+    import matplotlib.pyplot as plt
+
     plt.imshow(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
     plt.title("Icônes détectées")
     plt.axis("off")
@@ -0,0 +1,40 @@
+import numpy as np
+
+from vision import batch, transport
+
+
+def _shape(index, image, options):
+    """run_batch worker, module level so that process pools can pickle it."""
+    image = transport.attach(image)
+    return index, isinstance(image, str) or tuple(image.shape)
+
+
+class RecordingRing(transport.SharedImageRing):
+    created = 0
+
+    def __init__(self, *args, **kwargs):
+        RecordingRing.created += 1
+        super().__init__(*args, **kwargs)
+
+
+def run(monkeypatch, items):
+    RecordingRing.created = 0
+    monkeypatch.setattr(batch, "SharedImageRing", RecordingRing)
+    results = batch.run_batch(_shape, [(item,) for item in items], {},
+                                  workers=1, executor="process")
+    return sorted(results)
+
+
+def test_path_batches_do_not_create_a_ring(monkeypatch):
+    assert run(monkeypatch, ["a.png", "b.png"]) == [(0, True), (1, True)]
+    assert RecordingRing.created == 0
+
+
+def test_array_batches_go_through_a_ring(monkeypatch):
+    images = [np.zeros((4, 5, 3), np.uint8)] * 3
+    assert run(monkeypatch, images) == [(index, (4, 5, 3)) for index in range(3)]
+    assert RecordingRing.created == 1
+
+
+def test_empty_batch(monkeypatch):
+    assert run(monkeypatch, []) == []
@@ -0,0 +1,38 @@
+import os
+
+import cv2
+import pytest
+
+from vision.corpus import CorpusItem
+from vision.debug_sink import DebugSink
+from vision.puzzle import GeeTestIdentifier
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"backend": "fft"}, {"pyramid_levels": 1}])
+def test_background_barely_larger_than_the_piece(kwargs, tmp_path):
+    # The first match and its margin cover the whole response map, so only
+    # one match can be found
+    piece = cv2.imread(os.path.join(ROOT, "templates", "piece.png"))
+    background = cv2.imread(os.path.join(ROOT, "received_puzzle.png"))
+    background = background[:piece.shape[0] + 10, :piece.shape[1] + 10]
+    sink = DebugSink(str(tmp_path))
+    identifier = GeeTestIdentifier(background, piece, debugger=True, debug_sink=sink)
+    result = identifier.find_puzzle_piece_position(**kwargs)
+    sink.flush()
+    assert (tmp_path / "output.png").exists()
+    x, y = result["coordinates"]
+    assert 0 <= x <= background.shape[1] and 0 <= y <= background.shape[0]
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_unreadable_corpus_item_is_an_error_record(executor, tmp_path):
+    missing = CorpusItem(str(tmp_path / "missing.corpus"), 0, "missing.png")
+    pairs = [(missing, os.path.join(ROOT, "templates", "piece.png")),
+             (os.path.join(ROOT, "input.png"), os.path.join(ROOT, "templates", "piece.png"))]
+    records = sorted(GeeTestIdentifier.solve_batch(pairs, workers=1, executor=executor),
+                     key=lambda record: record["index"])
+    assert records[0]["background"] == "missing.png"
+    assert records[0]["error"].startswith("FileNotFoundError")
+    assert records[1]["result"]["coordinates"] == [502, 238]
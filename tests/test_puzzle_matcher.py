@@ -0,0 +1,59 @@
+import os
+import tracemalloc
+
+import pytest
+
+from vision.puzzle import GeeTestIdentifier, PuzzleMatcher
+from vision.result_cache import ResultCache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLES = [
+    ("received_puzzle.png", "templates/piece.png"),
+    ("input.png", "templates/piece.png"),
+]
+
+
+def identifier(background, piece, **kwargs):
+    return GeeTestIdentifier(os.path.join(ROOT, background), os.path.join(ROOT, piece),
+                             **kwargs)
+
+
+def peak_bytes(func):
+    """Peak bytes allocated during one call of `func`."""
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+@pytest.mark.parametrize("background, piece", SAMPLES)
+def test_matcher_gives_the_same_result(background, piece):
+    expected = identifier(background, piece).find_puzzle_piece_position()
+    matched = identifier(background, piece, matcher=PuzzleMatcher())
+    # Twice, so the second search runs in the buffers of the first
+    assert matched.find_puzzle_piece_position() == expected
+    assert matched.find_puzzle_piece_position() == expected
+
+
+@pytest.mark.parametrize("background, piece", SAMPLES)
+def test_warm_matcher_allocates_less_than_an_edge_map(background, piece):
+    matched = identifier(background, piece, matcher=PuzzleMatcher())
+    matched.find_puzzle_piece_position()
+    edge_map_bytes = matched.background.shape[0] * matched.background.shape[1]
+    assert peak_bytes(matched.find_puzzle_piece_position) < edge_map_bytes
+
+
+def test_result_cache_keeps_canny_thresholds_apart():
+    background, piece = SAMPLES[0]
+    cache = ResultCache()
+    low = identifier(background, piece, result_cache=cache,
+                     matcher=PuzzleMatcher(threshold1=10, threshold2=20))
+    expected_low = identifier(background, piece, matcher=PuzzleMatcher(10, 20))
+    assert low.find_puzzle_piece_position() == expected_low.find_puzzle_piece_position()
+    default = identifier(background, piece, result_cache=cache)
+    assert default.find_puzzle_piece_position() == \
+        identifier(background, piece).find_puzzle_piece_position()
@@ -0,0 +1,61 @@
+"""
+Computer vision engines of the captcha solver.
+
+    puzzle        GeeTestIdentifier / PuzzleMatcher: slider puzzle matching
+    icons         order_icons / TemplateBank: icon ordering by template matching
+    segmentation  HueSegmenter: colour-coded icon segmentation
+    correlation   normalized cross-correlation backends
+    peaks         top-K peak extraction from response maps
+    result_cache  content-hash result cache
+    metrics       stage timing spans and histograms
+    corpus        memory-mapped packs of decoded images
+    transport     shared-memory image slots for process workers
+    batch         thread/process batch runs and their JSONL output
+    debug_sink    background writer for debug images
+
+The matching core only imports cv2 and numpy. Optional helpers (the network
+test helpers, batch pools, SQLite persistence) import their dependencies on
+first use, and the names below are resolved lazily, so ``import vision``
+itself loads none of the submodules.
+"""
+import importlib
+
+_EXPORTS = {
+    "GeeTestIdentifier": "puzzle",
+    "PuzzleMatcher": "puzzle",
+    "read_image": "puzzle",
+    "TemplateBank": "icons",
+    "get_template_bank": "icons",
+    "order_icons": "icons",
+    "HueSegmenter": "segmentation",
+    "Segmentation": "segmentation",
+    "BACKENDS": "correlation",
+    "PreparedImage": "correlation",
+    "match_template": "correlation",
+    "find_peaks": "peaks",
+    "ResultCache": "result_cache",
+    "get_result_cache": "result_cache",
+    "image_key": "result_cache",
+    "METRICS": "metrics",
+    "Metrics": "metrics",
+    "ImageCorpus": "corpus",
+    "pack_images": "corpus",
+    "SharedImageRing": "transport",
+    "DebugSink": "debug_sink",
+    "get_sink": "debug_sink",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
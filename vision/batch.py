@@ -0,0 +1,114 @@
+"""
+Batch runs of the engines over many images, shared by the puzzle and icon
+batch modes and their command lines.
+
+run_batch() feeds items to a thread or process pool and yields the
+workers' records as they complete, and write_records() writes them out as
+JSON lines.
+"""
+import itertools
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from .transport import SharedImageRing, collect_completed
+
+# Executors run_batch() accepts
+BATCH_EXECUTORS = {"thread", "process"}
+
+# Files the batch command lines pick up from a directory or glob pattern
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".bmp")
+
+
+def run_batch(worker, items, options, workers=None, executor="thread", shared_memory=True,
+              images_per_item=1):
+    """
+    Call `worker(index, *item, options)` for every tuple of images in
+    `items` on a thread or process pool, and yield its results in
+    completion order.
+
+    `items` is consumed lazily, with at most two items per worker in
+    flight. OpenCV runs its own thread pool inside every call, so to keep
+    N workers from starting N of those pools on the same cores, thread
+    workers run with OpenCV single-threaded (the setting is process-wide and
+    restored afterwards) and each process worker gets an equal share of the
+    cores. With shared_memory, process workers receive the arrays of an item
+    through a SharedImageRing sized for `images_per_item` images per item;
+    `worker` must be picklable and attach() them. The ring is only set up
+    when the first item holds an array, so batches of paths, bytes or
+    corpus items never create one (arrays later in such a batch are
+    pickled).
+    """
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+    if executor not in BATCH_EXECUTORS:
+        raise ValueError(
+            f"Unknown executor {executor!r}. Choose from {sorted(BATCH_EXECUTORS)}.")
+    workers = workers or os.cpu_count() or 1
+    items = iter(items)
+    first = next(items, None)
+    if first is None:
+        return
+    ring = None
+    if executor == "process":
+        # Before the pool starts, see SharedImageRing
+        if shared_memory and any(isinstance(image, np.ndarray) for image in first):
+            ring = SharedImageRing(2 * workers * images_per_item)
+        cv_threads = max(1, (os.cpu_count() or 1) // workers)
+        pool = ProcessPoolExecutor(workers, initializer=cv2.setNumThreads,
+                                   initargs=(cv_threads,))
+    else:
+        pool = ThreadPoolExecutor(workers)
+
+    previous_threads = cv2.getNumThreads()
+    if executor == "thread":
+        cv2.setNumThreads(1)
+    try:
+        with pool:
+            pending = {}
+            for index, item in enumerate(itertools.chain([first], items)):
+                if len(pending) >= 2 * workers:
+                    yield from collect_completed(pending, ring)
+                if ring is not None:
+                    item = tuple(map(ring.share, item))
+                pending[pool.submit(worker, index, *item, options)] = item
+            while pending:
+                yield from collect_completed(pending, ring)
+    finally:
+        if executor == "thread":
+            cv2.setNumThreads(previous_threads)
+        if ring is not None:
+            ring.close()
+
+
+def write_records(records, output=None, noun="items"):
+    """
+    Write batch `records` as JSON lines to the `output` path (stdout if
+    None) as they come, then print their count and rate to stderr.
+
+    Returns the exit status of a batch command line: 1 if any record has an
+    `error`, else 0.
+    """
+    stream = open(output, "w") if output else sys.stdout
+    solved = failed = 0
+    start = time.perf_counter()
+    try:
+        for record in records:
+            stream.write(json.dumps(record) + "\n")
+            stream.flush()
+            if "error" in record:
+                failed += 1
+            else:
+                solved += 1
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+    elapsed = time.perf_counter() - start
+    total = solved + failed
+    print(f"{total} {noun} ({failed} failed) in {elapsed:.2f} s: "
+          f"{total / elapsed if elapsed else 0.0:.1f} {noun}/sec", file=sys.stderr)
+    return 1 if failed else 0
@@ -0,0 +1,179 @@
+"""
+Packed image corpora: many decoded images in one memory-mapped file.
+
+A corpus is a flat uint8 file holding the pixels of every image back to back
+(each one starting on a 64 byte boundary) and a JSON index next to it,
+``<path>.index.json``, with the name, shape, offset and content hash of
+every image. Reading an image is a zero-copy np.memmap view, so replaying
+an archive costs no PNG decoding at all, and every engine entry point takes
+those views like any other decoded image.
+
+    python -m vision.corpus pack archive.corpus captcha_images
+    python -m vision.corpus info archive.corpus
+"""
+import json
+import os
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+from .result_cache import image_key
+
+ALIGNMENT = 64
+
+INDEX_SUFFIX = ".index.json"
+
+FORMAT_VERSION = 1
+
+
+def index_path(path):
+    return path + INDEX_SUFFIX
+
+
+def pack_images(sources, path, grayscale=False):
+    """
+    Decode `sources` and pack them into the corpus at `path`.
+
+    Parameters
+    ----------
+    sources : iterable
+        Image paths, or (name, image) pairs where the image is anything
+        read_image accepts. Consumed lazily, one image at a time.
+    path : str
+        Corpus file to write. The index goes to ``path + ".index.json"``.
+    grayscale : bool, optional
+        Store single-channel images. The default keeps the decoded colour.
+
+    Returns
+    -------
+    int
+        Number of images packed. Images that fail to decode are skipped.
+    """
+    from .puzzle import read_image
+
+    entries = []
+    offset = 0
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        for source in sources:
+            name, image_source = (source, source) if isinstance(source, str) else source
+            image = read_image(image_source, grayscale)
+            if image is None:
+                continue
+            image = np.ascontiguousarray(image, dtype=np.uint8)
+            padding = -offset % ALIGNMENT
+            f.write(b"\0" * padding)
+            offset += padding
+            f.write(image.data)
+            entries.append({"name": str(name), "shape": list(image.shape), "offset": offset,
+                            "hash": image_key(image)})
+            offset += image.nbytes
+    os.replace(tmp_path, path)
+    tmp_index = index_path(path) + ".tmp"
+    with open(tmp_index, "w") as f:
+        json.dump({"version": FORMAT_VERSION, "entries": entries}, f)
+    os.replace(tmp_index, index_path(path))
+    return len(entries)
+
+
+class ImageCorpus:
+    """
+    Read-only view of a packed corpus.
+
+    Indexing by position or by name returns a read-only np.memmap view of
+    the image, without copying or decoding anything; the pages are read by
+    the OS as they are touched.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(index_path(path)) as f:
+            index = json.load(f)
+        if index.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported corpus version: {index.get('version')}")
+        self.entries = index["entries"]
+        self._positions = {entry["name"]: position
+                           for position, entry in enumerate(self.entries)}
+        size = os.path.getsize(path)
+        self._data = np.memmap(path, np.uint8, mode="r") if size else np.zeros(0, np.uint8)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, key):
+        entry = self.entries[self._positions[key] if isinstance(key, str) else key]
+        shape = tuple(entry["shape"])
+        size = int(np.prod(shape))
+        return self._data[entry["offset"]:entry["offset"] + size].reshape(shape)
+
+    def __iter__(self):
+        for position, entry in enumerate(self.entries):
+            yield entry["name"], self[position]
+
+    @property
+    def names(self):
+        return [entry["name"] for entry in self.entries]
+
+
+CorpusItem = namedtuple("CorpusItem", ["path", "position", "name"])
+CorpusItem.__doc__ = """
+Reference to one image of a corpus, cheap to send to worker processes,
+which map the corpus themselves (see open_corpus) instead of receiving pixels.
+"""
+
+_corpora = {}
+
+
+def open_corpus(path):
+    """Process-wide ImageCorpus for `path`, mapped on first use."""
+    if path not in _corpora:
+        _corpora[path] = ImageCorpus(path)
+    return _corpora[path]
+
+
+def corpus_items(path):
+    """CorpusItem of every image of the corpus at `path`, in order."""
+    return [CorpusItem(path, position, name)
+            for position, name in enumerate(open_corpus(path).names)]
+
+
+def load_item(item):
+    """The image a CorpusItem refers to, as a memmap view."""
+    return open_corpus(item.path)[item.position]
+
+
+def main(argv=None):
+    import argparse
+
+    from .icons import iter_images
+
+    parser = argparse.ArgumentParser(description="Pack images into a memory-mapped corpus.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    pack = commands.add_parser("pack", help="Decode images and pack them.")
+    pack.add_argument("corpus")
+    pack.add_argument("sources", nargs="+", help="Directories, image files or glob patterns.")
+    pack.add_argument("--grayscale", action="store_true")
+    info = commands.add_parser("info", help="Describe a corpus.")
+    info.add_argument("corpus")
+    args = parser.parse_args(argv)
+
+    if args.command == "pack":
+        paths = (path for source in args.sources for path in iter_images(source))
+        count = pack_images(paths, args.corpus, args.grayscale)
+        print(f"Packed {count} images into {args.corpus} "
+              f"({os.path.getsize(args.corpus) / 2**20:.1f} MiB)")
+    else:
+        corpus = ImageCorpus(args.corpus)
+        shapes = {}
+        for entry in corpus.entries:
+            shapes[tuple(entry["shape"])] = shapes.get(tuple(entry["shape"]), 0) + 1
+        print(f"{args.corpus}: {len(corpus)} images, "
+              f"{os.path.getsize(args.corpus) / 2**20:.1f} MiB")
+        for shape, count in sorted(shapes.items(), key=lambda item: -item[1]):
+            print(f"  {count:6d} x {shape}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+import os
+
+import cv2
+import numpy as np
+
+
+def fft_shape_for(image_shape):
+    """
+    DFT size used to correlate templates with an image of `image_shape`.
+
+    Correlating at the image size is enough: the valid part of the result
+    never wraps around, so the padding is only there for a fast DFT length.
+    """
+    return (cv2.getOptimalDFTSize(image_shape[0]),
+            cv2.getOptimalDFTSize(image_shape[1]))
+
+
+class PreparedTemplate:
+    """
+    A zero-mean template and its spectrum at a given DFT size.
+
+    Templates that are matched against many images of the same size can be
+    prepared once and reused.
+    """
+
+    def __init__(self, template, fft_shape):
+        self.shape = template.shape[:2]
+        self.fft_shape = tuple(fft_shape)
+        centered = template.astype(np.float64) - template.mean()
+        self.norm = float(np.sqrt(np.sum(centered * centered)))
+        padded = np.zeros(self.fft_shape, np.float32)
+        padded[:self.shape[0], :self.shape[1]] = centered
+        self.spectrum = cv2.dft(padded, nonzeroRows=self.shape[0])
+
+
+class PreparedImage:
+    """
+    An image prepared once for normalized cross-correlation with many templates.
+
+    The image spectrum and its integral images are computed up front, so each
+    template only costs a spectrum product and one inverse DFT (plus one
+    forward DFT if it is not already a PreparedTemplate). match() returns the
+    same map as cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED), up
+    to floating point rounding.
+    """
+
+    def __init__(self, image):
+        if image.ndim != 2 or image.dtype != np.uint8:
+            raise ValueError("PreparedImage expects a single-channel 8-bit image.")
+        self.shape = image.shape
+        self.fft_shape = fft_shape_for(image.shape)
+        padded = np.zeros(self.fft_shape, np.float32)
+        padded[:image.shape[0], :image.shape[1]] = image
+        self.spectrum = cv2.dft(padded, nonzeroRows=image.shape[0])
+        # Integer sums of 8-bit pixels are exact in int32 for any realistic
+        # size; the squared sums need float64 to stay exact
+        self.sum, self.sqsum = cv2.integral2(image, sdepth=cv2.CV_32S, sqdepth=cv2.CV_64F)
+
+    def prepare(self, template):
+        """PreparedTemplate of `template` for images of this size."""
+        return PreparedTemplate(template, self.fft_shape)
+
+    def _window_sums(self, integral, th, tw):
+        out_h, out_w = self.shape[0] - th + 1, self.shape[1] - tw + 1
+        return cv2.subtract(
+            cv2.subtract(integral[th:th + out_h, tw:tw + out_w], integral[:out_h, tw:tw + out_w]),
+            cv2.subtract(integral[th:th + out_h, :out_w], integral[:out_h, :out_w]))
+
+    def match(self, template):
+        """TM_CCOEFF_NORMED response of `template` over the prepared image."""
+        if not isinstance(template, PreparedTemplate):
+            template = self.prepare(template)
+        elif template.fft_shape != self.fft_shape:
+            raise ValueError("The template was prepared for another image size.")
+        th, tw = template.shape
+        if th > self.shape[0] or tw > self.shape[1]:
+            raise ValueError("The template is larger than the image.")
+        out_h, out_w = self.shape[0] - th + 1, self.shape[1] - tw + 1
+        if template.norm < np.finfo(np.float64).eps:
+            # OpenCV scores a flat template as a perfect match everywhere
+            return np.ones((out_h, out_w), np.float32)
+
+        # The template has zero mean, so correlating it with the raw image
+        # gives the numerator of the correlation coefficient directly
+        corr = cv2.idft(cv2.mulSpectrums(self.spectrum, template.spectrum, 0, conjB=True),
+                        flags=cv2.DFT_REAL_OUTPUT | cv2.DFT_SCALE)
+        numerator = corr[:out_h, :out_w]
+
+        # n * n * window variance, computed as n * sqsum - sum**2 from the
+        # integral images. Every term is an integer below 2**53, so float64
+        # holds it exactly and a flat window gives exactly 0, where
+        # sqsum - sum**2 / n would leave rounding noise
+        n = th * tw
+        window_sum = self._window_sums(self.sum, th, tw).astype(np.float64)
+        window_sqsum = self._window_sums(self.sqsum, th, tw)
+        scaled_variance = cv2.subtract(cv2.multiply(window_sqsum, float(n)),
+                                       cv2.multiply(window_sum, window_sum))
+        flat = scaled_variance <= np.finfo(np.float64).eps * n * window_sqsum
+        denominator = cv2.sqrt(cv2.max(scaled_variance, 0) / n).astype(np.float32)
+        response = cv2.divide(numerator, denominator, scale=1.0 / template.norm)
+
+        # Same handling as OpenCV: a flat window scores 0, ratios up to
+        # 1.125 are rounding noise and clamp to +/-1, anything beyond scores 0
+        response[flat | ~(np.abs(response) < 1.125)] = 0
+        np.clip(response, -1, 1, out=response)
+        return response
+
+
+def match_opencv(image, template, result=None):
+    """TM_CCOEFF_NORMED response of cv2.matchTemplate, written into `result` if given."""
+    return cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED, result=result)
+
+
+def match_fft(image, template, result=None):
+    """
+    TM_CCOEFF_NORMED response computed in the frequency domain, with the
+    window normalization taken from integral images (see PreparedImage).
+
+    Its cost barely depends on the template size, so it wins over the direct
+    correlation OpenCV uses for small templates once the template is a large
+    enough fraction of the image. The response is copied into `result` if
+    given, but the intermediate spectra are still allocated.
+    """
+    response = PreparedImage(image).match(template)
+    if result is not None:
+        np.copyto(result, response)
+        return result
+    return response
+
+
+# Normalized cross-correlation backends by name. A backend takes a
+# single-channel 8-bit image, a template no larger than it and an optional
+# float32 output buffer, and returns the TM_CCOEFF_NORMED response map.
+BACKENDS = {
+    "opencv": match_opencv,
+    "fft": match_fft,
+}
+
+# Backend used when none is given, overridable from the environment
+DEFAULT_BACKEND = os.environ.get("CORRELATION_BACKEND", "opencv")
+
+
+def resolve_backend(backend=None):
+    """Backend function given by name, as a callable, or None for the default."""
+    backend = DEFAULT_BACKEND if backend is None else backend
+    if callable(backend):
+        return backend
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown correlation backend: {backend}")
+    return BACKENDS[backend]
+
+
+def match_template(image, template, backend=None, result=None):
+    """TM_CCOEFF_NORMED response of `template` over `image` with the chosen backend."""
+    return resolve_backend(backend)(image, template, result)
@@ -0,0 +1,120 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+
+import cv2
+
+from .metrics import span
+
+
+class DebugSink:
+    """
+    Write debug images from a background thread instead of the hot path.
+
+    Callers ask sample() once per attempt and only draw and write their
+    artifacts when it says so, so a disabled or sampled-out sink costs a
+    counter update. Written images are queued to a single writer thread;
+    when the queue is full new artifacts are dropped (and counted) instead
+    of blocking detection. Images must not be modified after write().
+    """
+
+    def __init__(self, directory=".", sample_rate=1.0, max_queue=16, enabled=True):
+        '''
+        Parameters
+        ----------
+        directory : str, optional
+            Where the images are written. Created on first write.
+        sample_rate : float, optional
+            Fraction of attempts that produce debug output, between 0 and 1.
+            Sampling is deterministic: 0.25 keeps every fourth attempt.
+        max_queue : int, optional
+            Maximum number of images waiting to be written.
+        enabled : bool, optional
+            Off switch; a disabled sink never samples.
+        '''
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.enabled = enabled
+        self.dropped = 0
+        self.written = 0
+        self._credit = 0.0
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+
+    def sample(self):
+        """Whether the current attempt should produce debug output."""
+        if not self.enabled or self.sample_rate <= 0:
+            return False
+        with self._lock:
+            self._credit += self.sample_rate
+            if self._credit >= 1.0:
+                self._credit -= 1.0
+                return True
+        return False
+
+    def write(self, name, image):
+        """Queue `image` to be written as `name`. Returns False if it was dropped."""
+        if not self.enabled:
+            return False
+        self._start()
+        try:
+            self._queue.put_nowait((name, image))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        return True
+
+    def flush(self):
+        """Block until every queued image has been written."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        """Write the remaining images and stop the writer thread."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def _start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="debug-sink", daemon=True)
+            self._thread.start()
+        # Do not lose the last images of a short-lived script
+        atexit.register(self.close)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                name, image = item
+                os.makedirs(self.directory, exist_ok=True)
+                with span("debug_write"):
+                    written = cv2.imwrite(os.path.join(self.directory, name), image)
+                if written:
+                    self.written += 1
+                else:
+                    logging.warning(f"Failed to write debug image {name}")
+            except Exception as e:
+                logging.error(f"Failed to write debug image: {e}")
+            finally:
+                self._queue.task_done()
+
+
+_sinks = {}
+
+
+def get_sink(directory=".", **kwargs):
+    """Process-wide DebugSink for `directory`, created with `kwargs` on first use."""
+    if directory not in _sinks:
+        _sinks[directory] = DebugSink(directory, **kwargs)
+    return _sinks[directory]
@@ -0,0 +1,468 @@
+import glob
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from .batch import BATCH_EXECUTORS, IMAGE_EXTENSIONS, run_batch, write_records
+from .corpus import CorpusItem, corpus_items, load_item
+from .correlation import BACKENDS, match_template, resolve_backend
+from .metrics import METRICS, span, timed
+from .peaks import find_peaks
+from .puzzle import read_image
+from .result_cache import get_result_cache, image_key
+from .transport import attach
+
+SCALES = [0.8, 0.9, 1.0, 1.1, 1.2]
+
+DEFAULT_ICON_FILEPATHS = {
+    "calendar": 'templates/2.png',
+    "cart": 'templates/3.png',
+    "star": 'templates/1.png'
+}
+
+
+def _read_image(image_source, grayscale=False):
+    # read_image returns None for an unreadable file, the icon path reports it
+    image = read_image(image_source, grayscale)
+    if image is None:
+        raise FileNotFoundError(
+            f"Erreur: Impossible de charger l'image depuis {image_source}")
+    return image
+
+
+def to_gray(image):
+    if len(image.shape) > 2:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return image
+
+
+def apply_clahe(image):
+    # Enhance contrast using CLAHE (Contrast Limited Adaptive Histogram Equalization)
+    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+    return clahe.apply(image)
+
+
+# Named preprocessing stages, each taking and returning an image
+PREPROCESS_STAGES = {
+    "gray": to_gray,
+    "nlmeans": lambda image: cv2.fastNlMeansDenoising(image),
+    "bilateral": lambda image: cv2.bilateralFilter(image, 5, 50, 50),
+    "median": lambda image: cv2.medianBlur(image, 3),
+    "clahe": apply_clahe,
+}
+
+# Preprocessing pipelines by name. Non-local means denoising is by far the
+# most expensive stage; the others trade some match score for latency.
+PIPELINES = {
+    "nlmeans": ("gray", "nlmeans", "clahe"),
+    "bilateral": ("gray", "bilateral", "clahe"),
+    "median": ("gray", "median", "clahe"),
+    "none": ("gray", "clahe"),
+}
+
+# Pipeline used when none is given, overridable from the environment
+DEFAULT_PIPELINE = os.environ.get("ORDER_ICON_PIPELINE", "nlmeans")
+
+
+def resolve_pipeline(pipeline=None):
+    """Stage names of a pipeline given by name, as a sequence, or None for the default."""
+    pipeline = DEFAULT_PIPELINE if pipeline is None else pipeline
+    if isinstance(pipeline, str):
+        if pipeline not in PIPELINES:
+            raise ValueError(f"Unknown preprocessing pipeline: {pipeline}")
+        return PIPELINES[pipeline]
+    unknown = [stage for stage in pipeline if stage not in PREPROCESS_STAGES]
+    if unknown:
+        raise ValueError(f"Unknown preprocessing stages: {unknown}")
+    return tuple(pipeline)
+
+
+def preprocess_image(image, pipeline=None, timings=None):
+    """
+    Run the preprocessing pipeline on an image.
+
+    If `timings` is a dict, the time spent in each stage is added to it in
+    milliseconds, keyed by stage name. Stages are also recorded in the
+    metrics as preprocess.<stage>.
+    """
+    for stage in resolve_pipeline(pipeline):
+        start = time.perf_counter()
+        image = PREPROCESS_STAGES[stage](image)
+        elapsed = time.perf_counter() - start
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed * 1000
+        if METRICS.enabled:
+            METRICS.record(f"preprocess.{stage}", elapsed)
+
+    return image
+
+
+def resize_icon(icon, target_shape, min_size=20):
+    # Ensure icon is not too small
+    if icon.shape[0] < min_size or icon.shape[1] < min_size:
+        scale_factor = max(min_size / icon.shape[0], min_size / icon.shape[1])
+        new_width = int(icon.shape[1] * scale_factor)
+        new_height = int(icon.shape[0] * scale_factor)
+        icon = cv2.resize(icon, (new_width, new_height),
+                          interpolation=cv2.INTER_CUBIC)
+
+    # Resize if larger than target
+    if icon.shape[0] > target_shape[0] or icon.shape[1] > target_shape[1]:
+        scale_factor = min(
+            target_shape[0] / icon.shape[0], target_shape[1] / icon.shape[1])
+        new_width = int(icon.shape[1] * scale_factor)
+        new_height = int(icon.shape[0] * scale_factor)
+        icon = cv2.resize(icon, (new_width, new_height),
+                          interpolation=cv2.INTER_AREA)
+
+    return icon
+
+
+def scale_icon(icon, scales=SCALES):
+    return [cv2.resize(icon, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+            for scale in scales]
+
+
+def find_icon(icon, image, threshold=0.5, backend=None):
+    # Try multiple scales for better detection
+    return find_scaled_icon(scale_icon(icon), image, threshold, backend=backend)
+
+
+def find_scaled_icon(scaled_icons, image, threshold=0.5, early_exit=None, backend=None):
+    # Stop trying scales once one of them scores at least `early_exit`
+    best_result = None
+    best_score = threshold
+
+    for scaled_icon in scaled_icons:
+        if scaled_icon.shape[0] > image.shape[0] or scaled_icon.shape[1] > image.shape[1]:
+            continue
+
+        with span("correlation"):
+            result = match_template(image, scaled_icon, backend)
+        with span("peaks"):
+            peaks = find_peaks(result, k=1, min_score=best_score)
+        if not peaks:
+            continue
+        max_loc, max_val = peaks[0]
+
+        if max_val > best_score:
+            best_score = max_val
+            best_result = (max_loc, max_val)
+            if early_exit is not None and max_val >= early_exit:
+                break
+
+    if best_result is None:
+        return (0, 0), 0
+    return best_result
+
+
+def file_hash(filepath):
+    with open(filepath, 'rb') as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+
+class TemplateBank:
+    """
+    Preprocessed, resized and rescaled icon templates, built once and reused.
+
+    Templates are built lazily per captcha size and kept in memory. With a
+    cache_path they are also saved to a single .npz file, so a new process can
+    load them instead of running the preprocessing again. Every entry records
+    the content hash of its template file and is rebuilt when the file changes.
+    """
+
+    def __init__(self, icon_filepaths=None, scales=SCALES, cache_path=None, pipeline=None):
+        self.icon_filepaths = dict(icon_filepaths or DEFAULT_ICON_FILEPATHS)
+        self.scales = list(scales)
+        self.pipeline = resolve_pipeline(pipeline)
+        self.cache_path = cache_path
+        self._hashes = {}     # name -> content hash the entries were built from
+        self._stats = {}      # name -> (mtime, size) when the hash was taken
+        self._base = {}       # name -> preprocessed template
+        self._scaled = {}     # (name, captcha shape) -> scaled templates
+        if cache_path and os.path.exists(cache_path):
+            self.load()
+
+    def templates(self, name, target_shape):
+        """Scaled templates of icon `name` for a captcha of `target_shape`."""
+        self._check(name)
+        key = (name, tuple(target_shape[:2]))
+        if key not in self._scaled:
+            icon = resize_icon(self._base_template(name), target_shape)
+            self._scaled[key] = scale_icon(icon, self.scales)
+            if self.cache_path:
+                self.save()
+        return self._scaled[key]
+
+    def fingerprint(self, names):
+        """Content hashes of the template files of `names`, as used in result cache keys."""
+        for name in names:
+            self._check(name)
+        return {name: self._hashes[name] for name in names}
+
+    def _base_template(self, name):
+        if name not in self._base:
+            icon = _read_image(self.icon_filepaths[name], grayscale=True)
+            self._base[name] = preprocess_image(icon, self.pipeline)
+        return self._base[name]
+
+    def _check(self, name):
+        """Drop the entries of `name` if its template file has changed."""
+        filepath = self.icon_filepaths[name]
+        stat = os.stat(filepath)
+        stat = (stat.st_mtime_ns, stat.st_size)
+        if self._stats.get(name) == stat:
+            return
+        content_hash = file_hash(filepath)
+        if self._hashes.get(name) != content_hash:
+            self._invalidate(name)
+            self._hashes[name] = content_hash
+        self._stats[name] = stat
+
+    def _invalidate(self, name):
+        self._base.pop(name, None)
+        for key in [key for key in self._scaled if key[0] == name]:
+            del self._scaled[key]
+
+    def save(self, path=None):
+        """Write every built template to a single .npz file."""
+        path = path or self.cache_path
+        arrays = {}
+        entries = []
+        for name, base in self._base.items():
+            arrays[f"{name}/base"] = base
+        for (name, shape), scaled in self._scaled.items():
+            entries.append([name, list(shape)])
+            for index, icon in enumerate(scaled):
+                arrays[f"{name}/{shape[0]}x{shape[1]}/{index}"] = icon
+        meta = {"scales": self.scales, "pipeline": list(self.pipeline),
+                "hashes": self._hashes, "entries": entries}
+        arrays["meta"] = np.array(json.dumps(meta))
+        # Workers of a batch may save the same bank concurrently
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    def load(self, path=None):
+        """Load the templates saved by save() whose source files are unchanged."""
+        path = path or self.cache_path
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta["scales"] != self.scales or meta.get("pipeline") != list(self.pipeline):
+                return
+            for name, stored_hash in meta["hashes"].items():
+                filepath = self.icon_filepaths.get(name)
+                if filepath is None or not os.path.exists(filepath):
+                    continue
+                self._check(name)
+                if self._hashes[name] != stored_hash or f"{name}/base" not in data:
+                    continue
+                self._base[name] = data[f"{name}/base"]
+                for entry_name, shape in meta["entries"]:
+                    if entry_name != name:
+                        continue
+                    self._scaled[(name, tuple(shape))] = [
+                        data[f"{name}/{shape[0]}x{shape[1]}/{index}"]
+                        for index in range(len(self.scales))]
+
+
+_banks = {}
+
+
+def get_template_bank(icon_filepaths=None, cache_path=None, pipeline=None):
+    """Process-wide TemplateBank shared by every call with the same icons and pipeline."""
+    icon_filepaths = icon_filepaths or DEFAULT_ICON_FILEPATHS
+    pipeline = resolve_pipeline(pipeline)
+    key = (tuple(sorted(icon_filepaths.items())), cache_path, pipeline)
+    if key not in _banks:
+        _banks[key] = TemplateBank(icon_filepaths, cache_path=cache_path, pipeline=pipeline)
+    return _banks[key]
+
+
+def find_icons(bank, names, image, threshold=0.5, early_exit=None, backend=None):
+    """
+    Best (position, score) of every icon in `names` over a preprocessed image.
+
+    Every scaled template is matched with the correlation `backend` (None
+    is CORRELATION_BACKEND, else opencv).
+    """
+    return {
+        name: find_scaled_icon(bank.templates(name, image.shape),
+                               image, threshold, early_exit, backend)
+        for name in names
+    }
+
+
+@timed("order_icons")
+def order_icons(captcha_filepath, icon_filepaths=DEFAULT_ICON_FILEPATHS,
+                confidence_threshold=0.5, bank=None, early_exit=0.95,
+                pipeline=None, timings=None, result_cache=None, backend=None):
+    # The captcha and the templates must go through the same pipeline
+    if bank is None:
+        bank = get_template_bank(icon_filepaths, pipeline=pipeline)
+    elif pipeline is not None and resolve_pipeline(pipeline) != bank.pipeline:
+        raise ValueError("The template bank was built with another preprocessing pipeline")
+
+    captcha_image = _read_image(captcha_filepath)
+
+    # Identical captchas (retries, reruns) are answered from the cache
+    cache_key = None
+    if result_cache is not None:
+        cache_key = image_key(
+            captcha_image, engine="order_icons", icons=bank.fingerprint(icon_filepaths),
+            threshold=confidence_threshold, early_exit=early_exit,
+            pipeline=list(bank.pipeline), scales=bank.scales,
+            backend=resolve_backend(backend).__name__)
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return tuple(cached)
+
+    # Preprocess the captcha image
+    captcha_gray = preprocess_image(captcha_image, bank.pipeline, timings)
+
+    icon_positions = []
+
+    # Match every icon against the same prepared captcha
+    start = time.perf_counter()
+    matches = find_icons(bank, icon_filepaths, captcha_gray,
+                         confidence_threshold, early_exit, backend)
+    if timings is not None:
+        timings["match"] = timings.get("match", 0.0) + (time.perf_counter() - start) * 1000
+    for name, (position, score) in matches.items():
+
+        if score >= confidence_threshold:
+            icon_positions.append({
+                'name': name,
+                'x': position[0],
+                'position': position,
+                'score': score
+            })
+
+    if not icon_positions:
+        raise ValueError("No icons were detected with sufficient confidence")
+
+    ordered_icons = sorted(icon_positions, key=lambda x: x['x'])
+    order = [icon['name'] for icon in ordered_icons]
+    scores = [float(icon['score']) for icon in ordered_icons]
+
+    if cache_key is not None:
+        result_cache.put(cache_key, [order, scores])
+    return order, scores
+
+
+def iter_images(source):
+    """
+    Image paths of a directory (sorted, not recursive) or of a glob pattern,
+    yielded lazily. A single file is yielded as is, and a packed corpus
+    (.corpus, see vision.corpus) as a CorpusItem per image.
+    """
+    if source.endswith(".corpus") and os.path.isfile(source):
+        yield from corpus_items(source)
+    elif os.path.isdir(source):
+        names = sorted(entry.name for entry in os.scandir(source)
+                       if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS))
+        for name in names:
+            yield os.path.join(source, name)
+    elif os.path.isfile(source):
+        yield source
+    else:
+        for path in glob.iglob(source, recursive=True):
+            if path.lower().endswith(IMAGE_EXTENSIONS):
+                yield path
+
+
+def _order_one(index, filepath, options):
+    """Batch worker: decode, preprocess and match one captcha, timing every stage."""
+    record = {"index": index}
+    timings = {}
+    try:
+        start = time.perf_counter()
+        if isinstance(filepath, CorpusItem):
+            # A memmap view of the corpus, mapped once per worker
+            record["path"] = filepath.name
+            image = load_item(filepath)
+        else:
+            if isinstance(filepath, str):
+                record["path"] = filepath
+            image = _read_image(attach(filepath))
+        timings["decode"] = (time.perf_counter() - start) * 1000
+        bank = get_template_bank(options["icon_filepaths"], options["cache_path"],
+                                 options["pipeline"])
+        result_cache = None
+        if options["result_cache"]:
+            result_cache = get_result_cache(options["result_cache"])
+        order, scores = order_icons(
+            image, options["icon_filepaths"], options["confidence_threshold"],
+            bank=bank, early_exit=options["early_exit"], timings=timings,
+            result_cache=result_cache, backend=options["backend"])
+        record["order"] = order
+        record["scores"] = [round(float(score), 4) for score in scores]
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["ms"] = {stage: round(ms, 3) for stage, ms in timings.items()}
+    return record
+
+
+def batch_order_icons(filepaths, workers=None, executor="process",
+                      icon_filepaths=DEFAULT_ICON_FILEPATHS, confidence_threshold=0.5,
+                      early_exit=0.95, pipeline=None, cache_path=None, result_cache=None,
+                      backend=None, shared_memory=True):
+    """
+    Order the icons of many captcha images in parallel.
+
+    `filepaths` is consumed lazily and a record is yielded per image as soon
+    as it is done (in completion order; `index` is the position in
+    `filepaths`), see vision.batch.run_batch for the queueing and OpenCV
+    threading. Every worker
+    builds its template bank once, or loads it from `cache_path`, and each
+    record has the `order` and `scores`, or an `error`, and the `ms` spent in
+    decoding, in every preprocessing stage and in matching. With a
+    `result_cache` SQLite file, images already ordered by an earlier run
+    are answered from it (their record then only has decode ms).
+
+    `filepaths` may also hold corpus items (vision.corpus), bytes or decoded
+    arrays; records only have a `path` for paths and corpus items. With
+    shared_memory, process workers receive arrays through a
+    vision.transport.SharedImageRing rather than pickled.
+    """
+    options = dict(icon_filepaths=icon_filepaths, confidence_threshold=confidence_threshold,
+                   early_exit=early_exit, pipeline=resolve_pipeline(pipeline),
+                   cache_path=cache_path, result_cache=result_cache, backend=backend)
+    return run_batch(_order_one, ((filepath,) for filepath in filepaths), options,
+                     workers=workers, executor=executor, shared_memory=shared_memory)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Order the icons of every captcha image in a directory or glob.")
+    parser.add_argument("source", nargs="?", default="imgs",
+                        help="Directory, image file, glob pattern (quote it) or .corpus file.")
+    parser.add_argument("--output", help="JSONL output file. The default is stdout.")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--executor", choices=sorted(BATCH_EXECUTORS), default="process")
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--early-exit", type=float, default=0.95)
+    parser.add_argument("--pipeline", choices=sorted(PIPELINES), default=None)
+    parser.add_argument("--cache", help="Template bank .npz shared by the workers.")
+    parser.add_argument("--result-cache", help="SQLite file caching results across runs.")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default=None,
+                        help="Correlation backend. The default is CORRELATION_BACKEND or opencv.")
+    args = parser.parse_args(argv)
+
+    return write_records(batch_order_icons(
+        iter_images(args.source), workers=args.workers, executor=args.executor,
+        confidence_threshold=args.threshold, early_exit=args.early_exit,
+        pipeline=args.pipeline, cache_path=args.cache,
+        result_cache=args.result_cache, backend=args.backend), args.output, noun="images")
+
+if __name__ == "__main__":
+    sys.exit(main())
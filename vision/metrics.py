@@ -0,0 +1,175 @@
+import atexit
+import functools
+import json
+import os
+import random
+import threading
+import time
+
+
+class Histogram:
+    """
+    Durations of one stage: exact count, sum and max, and quantiles estimated
+    from a uniform reservoir sample of at most `max_samples` durations.
+    """
+
+    def __init__(self, max_samples=4096):
+        self.max_samples = max_samples
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._samples = []
+
+    def record(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        if len(self._samples) < self.max_samples:
+            self._samples.append(seconds)
+        else:
+            # Reservoir sampling keeps every duration equally likely to stay
+            index = random.randrange(self.count)
+            if index < self.max_samples:
+                self._samples[index] = seconds
+
+    def quantile(self, q):
+        """Nearest-rank `q` quantile of the sampled durations, in seconds."""
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, max(0, int(q * len(ordered) + 0.5) - 1))]
+
+
+class _Span:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Metrics:
+    """
+    Stage timings aggregated into per-stage histograms.
+
+    Stages are timed with span() as a context manager or with the timed()
+    decorator. While the registry is disabled, span() hands back one shared
+    no-op context manager and timed() functions call straight through, so
+    instrumented code only pays for an attribute check.
+    """
+
+    QUANTILES = (0.5, 0.95, 0.99)
+
+    def __init__(self, enabled=False, max_samples=4096):
+        '''
+        Parameters
+        ----------
+        enabled : bool, optional
+            Whether spans are recorded. The default is False.
+        max_samples : int, optional
+            Durations kept per stage for the quantile estimates.
+        '''
+        self.enabled = enabled
+        self.max_samples = max_samples
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def span(self, name):
+        """Context manager timing the stage `name`."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def timed(self, name):
+        """Decorator timing every call of the function as the stage `name`."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Span(self, name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record(self, name, seconds):
+        """Add a duration in seconds to the stage `name`."""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(self.max_samples)
+            histogram.record(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def snapshot(self):
+        """Count, sum, max and quantiles of every stage, in milliseconds."""
+        with self._lock:
+            return {
+                name: {
+                    "count": histogram.count,
+                    "sum_ms": histogram.total * 1000,
+                    "max_ms": histogram.max * 1000,
+                    **{f"p{round(q * 100)}_ms": histogram.quantile(q) * 1000
+                       for q in self.QUANTILES},
+                }
+                for name, histogram in sorted(self._histograms.items())
+            }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, metric="vision_stage_seconds"):
+        """The stages as one Prometheus summary in text exposition format."""
+        lines = [f"# HELP {metric} Time spent in each solver stage.",
+                 f"# TYPE {metric} summary"]
+        with self._lock:
+            for name, histogram in sorted(self._histograms.items()):
+                for q in self.QUANTILES:
+                    lines.append(f'{metric}{{stage="{name}",quantile="{q}"}} '
+                                 f'{histogram.quantile(q):.9f}')
+                lines.append(f'{metric}_sum{{stage="{name}"}} {histogram.total:.9f}')
+                lines.append(f'{metric}_count{{stage="{name}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        """Write the snapshot to `path`, in Prometheus format for .prom files, else JSON."""
+        text = self.to_prometheus() if path.endswith(".prom") else self.to_json()
+        with open(path, "w") as f:
+            f.write(text)
+
+
+# Process-wide registry used by the vision modules. VISION_METRICS=1 turns
+# it on; VISION_METRICS_FILE also writes it out (.prom or JSON) at exit.
+# Spans recorded inside process pool workers stay in those workers.
+METRICS = Metrics(enabled=os.environ.get("VISION_METRICS", "0") == "1")
+
+span = METRICS.span
+timed = METRICS.timed
+
+if os.environ.get("VISION_METRICS_FILE"):
+    atexit.register(METRICS.dump, os.environ["VISION_METRICS_FILE"])
@@ -0,0 +1,81 @@
+import cv2
+import numpy as np
+
+
+def find_peaks(response, k=2, radius=20, min_score=None, footprint=None, buffer=None):
+    """
+    Find the top-K peaks of a template matching response map.
+
+    Greedy non-maximum suppression: the best point is taken, the points
+    around it are suppressed, then the best remaining point is taken, and so
+    on. Each step is one cv2.minMaxLoc over a scratch copy of the map, so the
+    response map itself is left untouched.
+
+    Parameters
+    ----------
+    response : numpy.ndarray
+        Single-channel float response map, e.g. from cv2.matchTemplate.
+    k : int, optional
+        Maximum number of peaks to return. The default is 2.
+    radius : int or (int, int), optional
+        Margin in pixels suppressed around a peak, the same along both axes
+        or as (rx, ry). The default is 20.
+    min_score : float, optional
+        Ignore points scoring below this value. The default keeps everything.
+    footprint : (int, int), optional
+        (w, h) of the matched template. The suppressed rectangle is then the
+        template placed at the peak, grown by `radius` on every side:
+        [x - rx, x + w + rx) x [y - ry, y + h + ry). The default suppresses
+        [x - rx, x + rx] x [y - ry, y + ry].
+    buffer : numpy.ndarray, optional
+        float32 scratch buffer shaped like `response`, to avoid allocating
+        the copy per call.
+
+    Returns
+    -------
+    list of ((x, y), score)
+        Peaks sorted by descending score, at most `k` of them.
+    """
+    if k == 1:
+        # A single peak needs no suppression at all
+        _, max_val, _, max_loc = cv2.minMaxLoc(response)
+        if min_score is not None and max_val < min_score:
+            return []
+        return [(max_loc, float(max_val))]
+
+    radius_x, radius_y = (radius, radius) if np.isscalar(radius) else radius
+    width, height = footprint or (1, 1)
+    if buffer is None:
+        scores = response.astype(np.float32)
+    else:
+        scores = buffer
+        np.copyto(scores, response)
+
+    peaks = []
+    for _ in range(k):
+        _, max_val, _, (x, y) = cv2.minMaxLoc(scores)
+        if max_val == -np.inf or (min_score is not None and max_val < min_score):
+            break
+        peaks.append(((x, y), float(max_val)))
+        scores[max(0, y - radius_y):y + height + radius_y,
+               max(0, x - radius_x):x + width + radius_x] = -np.inf
+    return peaks
+
+
+def suppress_matches(matches, k=2, radius=20, footprint=None):
+    """
+    Greedy non-maximum suppression of a list of ((x, y), score) matches,
+    with the same suppressed rectangle as find_peaks, e.g. to merge matches
+    refined separately. Returns at most `k` of them, best first.
+    """
+    radius_x, radius_y = (radius, radius) if np.isscalar(radius) else radius
+    width, height = footprint or (1, 1)
+    kept = []
+    for (x, y), score in sorted(matches, key=lambda match: match[1], reverse=True):
+        if len(kept) == k:
+            break
+        if all(not (kept_x - radius_x <= x < kept_x + width + radius_x
+                    and kept_y - radius_y <= y < kept_y + height + radius_y)
+               for (kept_x, kept_y), _ in kept):
+            kept.append(((x, y), score))
+    return kept
@@ -0,0 +1,617 @@
+import numpy as np
+import io
+import cv2
+import os
+import logging
+import sys
+import threading
+
+from .batch import BATCH_EXECUTORS, IMAGE_EXTENSIONS, run_batch, write_records
+from .corpus import CorpusItem, load_item
+from .correlation import BACKENDS, match_template, resolve_backend
+from .debug_sink import get_sink
+from .metrics import span, timed
+from .peaks import find_peaks, suppress_matches
+from .result_cache import get_result_cache, image_key
+from .transport import attach
+
+# PIL, requests and bs4 are only needed by the network test helpers and
+# get_puzzle_piece_box, and the pool executors only by the batch modes, so they
+# are imported on first use: matching itself only needs cv2 and numpy.
+
+
+def read_image(image_source, grayscale=False, unchanged=False):
+    """
+    Read an image from a file path, bytes, a file-like object or an already
+    decoded array, which is returned as is (only converted to grayscale if
+    asked), so callers holding a decoded image never decode it again.
+    With grayscale=True the image is decoded to a single channel, with
+    unchanged=True it is decoded as stored, alpha channel included.
+    """
+    if isinstance(image_source, np.ndarray):
+        if grayscale and not unchanged and image_source.ndim == 3:
+            code = cv2.COLOR_BGRA2GRAY if image_source.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+            return cv2.cvtColor(image_source, code)
+        return image_source
+    if unchanged:
+        flags = path_flags = cv2.IMREAD_UNCHANGED
+    elif grayscale:
+        flags = path_flags = cv2.IMREAD_GRAYSCALE
+    else:
+        flags, path_flags = cv2.IMREAD_ANYCOLOR, cv2.IMREAD_COLOR
+    with span("decode"):
+        if isinstance(image_source, bytes):
+            return cv2.imdecode(np.frombuffer(image_source, np.uint8), flags)
+        elif hasattr(image_source, 'read'):  # Checks if it's a file-like object
+            return cv2.imdecode(np.frombuffer(image_source.read(), np.uint8), flags)
+        elif isinstance(image_source, str):  # Handle file path
+            return cv2.imread(image_source, path_flags)
+    raise TypeError(
+        "Invalid image source type. Must be bytes, file-like object, file path or array.")
+
+
+# Margin in pixels around the template footprint of a match in which no
+# second match is taken
+MATCH_MARGIN = 20
+
+# Thickens the 1 pixel Canny edges before every pyrDown of the pyramid search,
+# so that they are not averaged away
+PYRAMID_DILATE_KERNEL = np.ones((3, 3), np.uint8)
+
+# Response maps with fewer cells than this are searched exhaustively even
+# when pyramid levels are asked for. Below it (slider-sized canvases, whose
+# response is a single row, or band searches) refining the coarse candidates
+# costs more than the full search and is less reliable.
+PYRAMID_MIN_RESPONSE = 1 << 16
+
+
+class PuzzleMatcher:
+    """
+    Edge detection and exhaustive matching with buffers reused across calls.
+
+    Every output of the matching path (both edge maps, the response map and
+    the peak search scratch maps) is written into a buffer kept by name and
+    passed to OpenCV as its `dst`. A buffer is only reallocated when the
+    shape asked for changes, so once a matcher has seen the canvas sizes it
+    is used with, repeated calls allocate next to nothing. Results returned
+    by edges() and match_template() are overwritten by the next call.
+
+    A matcher is not thread-safe; give every thread its own.
+    """
+
+    def __init__(self, threshold1=100, threshold2=200):
+        self.threshold1 = threshold1
+        self.threshold2 = threshold2
+        self._buffers = {}
+
+    def buffer(self, name, shape, dtype=np.uint8):
+        """The buffer called `name`, (re)allocated if its shape or dtype differ."""
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != tuple(shape) or buffer.dtype != dtype:
+            buffer = self._buffers[name] = np.empty(shape, dtype)
+        return buffer
+
+    def edges(self, name, image):
+        """Canny edge map of `image`, in the buffer called `name`."""
+        with span("canny"):
+            return cv2.Canny(image, self.threshold1, self.threshold2,
+                             self.buffer(name, image.shape[:2]))
+
+    def match_template(self, search_area, template, backend=None):
+        """TM_CCOEFF_NORMED response map of `template` over `search_area`."""
+        shape = (search_area.shape[0] - template.shape[0] + 1,
+                 search_area.shape[1] - template.shape[1] + 1)
+        with span("correlation"):
+            return match_template(search_area, template, backend,
+                                  result=self.buffer('response', shape, np.float32))
+
+    def find_matches(self, search_area, template, k=2, radius=MATCH_MARGIN, backend=None):
+        """
+        The best `k` matches of `template`, as find_peaks returns them, no
+        match within `radius` pixels of the footprint of a better one.
+        """
+        response = self.match_template(search_area, template, backend)
+        with span("peaks"):
+            footprint = (template.shape[1], template.shape[0])
+            return find_peaks(response, k=k, radius=radius, footprint=footprint,
+                              buffer=self.buffer('peak_scores', response.shape, np.float32))
+
+
+class GeeTestIdentifier:
+    def __init__(self, background, puzzle_piece, debugger=False, grayscale=False,
+                 keep_alpha=False, debug_sink=None, result_cache=None, matcher=None):
+        '''
+        GeeTestIdentifier class constructor.
+
+        Parameters
+        ----------
+        background : str or bytes or file-like object or numpy.ndarray
+            The background image path or data.
+        puzzle_piece : str or bytes or file-like object or numpy.ndarray
+            The puzzle piece image path or data.
+        debugger : bool, optional
+            Whether to draw the results on the background image. The default is False.
+        grayscale : bool, optional
+            Decode both images straight to a single grayscale channel. Only
+            the edge maps are used for matching, so this skips the colour
+            decode, but Canny then sees the luma instead of the strongest
+            colour gradient and edges can differ slightly. The default is False.
+        keep_alpha : bool, optional
+            Decode the puzzle piece with its alpha channel and keep the alpha
+            in `puzzle_alpha`, which the band search of
+            find_puzzle_piece_position needs. The default is False.
+        debug_sink : DebugSink, optional
+            Where the debugger output (input.png, output.png) is written in
+            the background. The default is the shared sink for the working
+            directory.
+        result_cache : ResultCache, optional
+            Cache of find_puzzle_piece_position results, keyed by the decoded
+            images and the search parameters. A hit skips the search and the
+            debugger output. The default is no caching.
+        matcher : PuzzleMatcher, optional
+            Long-lived matcher whose buffers the search writes into, so that
+            solving many puzzles of the same size does not reallocate them.
+            The default uses a new matcher for every search.
+        '''
+        self.background = self._read_image(background, grayscale)
+        if keep_alpha:
+            self.puzzle_piece, self.puzzle_alpha = self._split_alpha(
+                self._read_image(puzzle_piece, unchanged=True), grayscale)
+        else:
+            self.puzzle_piece = self._read_image(puzzle_piece, grayscale)
+            self.puzzle_alpha = None
+        self.debugger = debugger
+        self.debug_sink = debug_sink
+        self.result_cache = result_cache
+        self.matcher = matcher
+
+    @staticmethod
+    def test(background_path=None, puzzle_piece_path=None):
+        """
+        Test the puzzle piece detection with either local files or downloaded test images.
+
+        Parameters
+        ----------
+        background_path : str, optional
+            Path to local background image. If None, downloads test image.
+        puzzle_piece_path : str, optional
+            Path to local puzzle piece image. If None, downloads test image.
+        """
+        if background_path and puzzle_piece_path:
+            identifier = GeeTestIdentifier(
+                background=background_path,
+                puzzle_piece=puzzle_piece_path,
+                debugger=True
+            )
+        else:
+            data = GeeTestIdentifier.load_test()
+            identifier = GeeTestIdentifier(
+                background=GeeTestIdentifier.load_image(data['background']),
+                puzzle_piece=GeeTestIdentifier.load_image(data['puzzle']),
+                debugger=True
+            )
+        result = identifier.find_puzzle_piece_position()
+        print(f"Result: {result}")
+
+    @staticmethod
+    def solve_batch(pairs, workers=None, executor="thread", grayscale=False,
+                    keep_alpha=False, result_cache=None, shared_memory=True,
+                    **find_kwargs):
+        """
+        Solve many background/piece pairs in parallel.
+
+        Results are yielded in completion order, and every result carries
+        the `index` of its pair. `pairs` can be a long lazy iterable; see
+        vision.batch.run_batch for the queueing and OpenCV threading.
+
+        Parameters
+        ----------
+        pairs : iterable
+            (background, puzzle_piece) pairs, each a path, bytes, array or
+            vision.corpus.CorpusItem. Paths and corpus items are cheapest
+            with executor="process", since the pixels are not sent to the
+            worker; arrays go through shared memory (see shared_memory).
+        workers : int, optional
+            Number of workers. The default is one per CPU.
+        executor : str, optional
+            "thread" or "process". The default is "thread".
+        grayscale, keep_alpha : bool, optional
+            Passed to the GeeTestIdentifier constructor.
+        result_cache : str, optional
+            SQLite result cache file shared by the workers, so that a rerun
+            skips the pairs already solved. The default is no caching.
+        shared_memory : bool, optional
+            With executor="process", hand arrays to the workers through a
+            vision.transport.SharedImageRing instead of pickling them. The
+            default is True.
+        **find_kwargs
+            Passed to find_puzzle_piece_position (pyramid_levels, ...).
+
+        Yields
+        ------
+        dict
+            `index`, the `background` and `piece` when they are paths, and
+            either the `result` of find_puzzle_piece_position or an `error`.
+        """
+        options = dict(grayscale=grayscale, keep_alpha=keep_alpha,
+                       result_cache=result_cache, find_kwargs=find_kwargs)
+        return run_batch(_solve_pair, pairs, options, workers=workers, executor=executor,
+                         shared_memory=shared_memory, images_per_item=2)
+
+    @staticmethod
+    def load_image(url: str) -> np.ndarray:
+        import requests
+
+        response = requests.get(url)
+        response.raise_for_status()  # This will raise an error for bad responses
+        return response.content
+
+    @staticmethod
+    def load_test():
+        import requests
+        from bs4 import BeautifulSoup
+
+        response = requests.get(
+            'https://edge-functions-bot-protection-datadome.vercel.app/blocked',
+            headers={
+                'authority': 'edge-functions-bot-protection-datadome.vercel.app',
+                'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
+                'accept-language': 'it-IT,it;q=0.9,en-US;q=0.8,en;q=0.7',
+                'cache-control': 'no-cache',
+                'pragma': 'no-cache',
+                'sec-ch-device-memory': '8',
+                'sec-ch-ua': '"Not A(Brand";v="99", "Google Chrome";v="121", "Chromium";v="121"',
+                'sec-ch-ua-arch': '"arm"',
+                'sec-ch-ua-full-version-list': '"Not A(Brand";v="99.0.0.0", "Google Chrome";v="121.0.6167.85", "Chromium";v="121.0.6167.85"',
+                'sec-ch-ua-mobile': '?0',
+                'sec-ch-ua-model': '""',
+                'sec-ch-ua-platform': '"macOS"',
+                'sec-fetch-dest': 'document',
+                'sec-fetch-mode': 'navigate',
+                'sec-fetch-site': 'none',
+                'sec-fetch-user': '?1',
+                'upgrade-insecure-requests': '1',
+                'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
+            }
+        )
+        images = BeautifulSoup(response.text, 'html.parser').\
+            find_all("link", {"rel": "preload", "as": "image"})
+        return {
+            "background": images[0]['href'],
+            "puzzle": images[1]['href']
+        }
+
+    def _read_image(self, image_source, grayscale=False, unchanged=False):
+        """
+        Read an image from a file path, bytes, a file-like object or an
+        already decoded array. See read_image.
+        """
+        return read_image(image_source, grayscale, unchanged)
+
+    @staticmethod
+    def _split_alpha(image, grayscale=False):
+        """
+        Split an image decoded with its alpha channel into the colour (or
+        grayscale) image and the alpha mask. The mask is None without alpha.
+        """
+        if image.ndim == 3 and image.shape[2] == 4:
+            code = cv2.COLOR_BGRA2GRAY if grayscale else cv2.COLOR_BGRA2BGR
+            return cv2.cvtColor(image, code), image[:, :, 3]
+        if grayscale and image.ndim == 3:
+            return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), None
+        return image, None
+
+    def _alpha_box(self, padding=2):
+        """
+        Bounding box (x, y, w, h) of the non-transparent part of the puzzle
+        piece, grown by `padding` pixels so the outline edges stay inside.
+        """
+        if self.puzzle_alpha is None:
+            raise ValueError(
+                "The band search needs the puzzle piece alpha channel. "
+                "Create the identifier with keep_alpha=True and an RGBA piece.")
+        x, y, w, h = cv2.boundingRect(self.puzzle_alpha)
+        if w == 0 or h == 0:
+            raise ValueError("The puzzle piece is fully transparent.")
+        x_start, y_start = max(0, x - padding), max(0, y - padding)
+        x_end = min(self.puzzle_alpha.shape[1], x + w + padding)
+        y_end = min(self.puzzle_alpha.shape[0], y + h + padding)
+        return x_start, y_start, x_end - x_start, y_end - y_start
+
+    @timed("find_puzzle_piece_position")
+    def find_puzzle_piece_position(self, pyramid_levels=0, refine_radius=8,
+                                   band_margin=None, backend=None):
+        """
+        Find the matching positions of puzzle pieces in a background image.
+        Returns the position of both matches.
+
+        Parameters
+        ----------
+        pyramid_levels : int, optional
+            Number of times the edge maps are halved for a coarse search
+            before refining at full resolution. The default 0 runs the
+            exhaustive full-resolution search. The pyramid only runs when the
+            response map has at least PYRAMID_MIN_RESPONSE cells, so it is
+            ignored for slider-sized canvases, where it is slower than the
+            exhaustive search. On the large bundled samples it finds the same
+            matches, at most about 1.5x faster, but in general it can miss
+            the weaker second match and give another position than the
+            exhaustive search.
+        refine_radius : int, optional
+            Half-size in pixels of the full-resolution window searched around
+            each coarse candidate. Only used when pyramid_levels > 0.
+        band_margin : int, optional
+            When set, crop the piece to its alpha bounding box and only search
+            the rows of the background at the piece's own vertical offset,
+            give or take `band_margin` pixels. The slider only moves along x,
+            so this turns the search into a nearly one-dimensional scan with
+            a much smaller template. Needs keep_alpha=True and assumes the
+            piece canvas shares the background's vertical frame.
+        backend : str or callable, optional
+            Normalized cross-correlation backend, a name from
+            correlation.BACKENDS ("opencv", "fft") or a backend function.
+            The default is correlation.DEFAULT_BACKEND.
+        """
+        matcher = self.matcher or PuzzleMatcher()
+        cache_key = None
+        if self.result_cache is not None:
+            # The Canny thresholds change the edge maps, so they are part of the key
+            cache_key = image_key(
+                self.background, self.puzzle_piece, self.puzzle_alpha, engine="puzzle",
+                pyramid_levels=pyramid_levels, refine_radius=refine_radius,
+                band_margin=band_margin, backend=resolve_backend(backend).__name__,
+                canny_thresholds=[matcher.threshold1, matcher.threshold2])
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        # Apply edge detection. The edge maps stay single-channel all the way
+        # through matching: correlating three identical copies of them gives
+        # the same normalized score for three times the work.
+        edge_puzzle_piece = matcher.edges('piece_edges', self.puzzle_piece)
+        edge_background = matcher.edges('background_edges', self.background)
+
+        template, search_area = edge_puzzle_piece, edge_background
+        if band_margin is not None:
+            # Only the opaque part of the piece, only the rows it can be in
+            box_x, box_y, box_w, box_h = self._alpha_box()
+            template = edge_puzzle_piece[box_y:box_y + box_h, box_x:box_x + box_w]
+            band_top = max(0, box_y - band_margin)
+            band_bottom = min(edge_background.shape[0], box_y + box_h + band_margin)
+            search_area = edge_background[band_top:band_bottom]
+
+        h, w = template.shape[:2]
+        response_cells = (search_area.shape[0] - h + 1) * (search_area.shape[1] - w + 1)
+        if pyramid_levels > 0 and response_cells >= PYRAMID_MIN_RESPONSE:
+            matches = self._pyramid_matches(
+                search_area, template, pyramid_levels, refine_radius, backend=backend)
+        else:
+            # Template matching
+            matches = matcher.find_matches(search_area, template, k=2, backend=backend)
+
+        if band_margin is not None:
+            # Report matches for the whole piece canvas like the full search
+            matches = [((x - box_x, y + band_top - box_y), val)
+                       for (x, y), val in matches]
+            h, w = edge_puzzle_piece.shape[:2]
+
+        # Sort matches by x coordinate (left to right)
+        matches.sort(key=lambda x: x[0][0])
+        logging.debug(f"Puzzle matches: {matches}")
+        # Get the rightmost match. When the first match and its margin cover
+        # the whole response map there is no second one, use the only match
+        top_left, max_val = matches[-1]
+        bottom_right = (top_left[0] + w, top_left[1] + h)
+
+        # Calculate required values
+        center_x = top_left[0] + w // 2
+        center_y = top_left[1] + h // 2
+        position_from_left = center_x
+        position_from_bottom = self.background.shape[0] - center_y
+
+        # Draw rectangle, lines, and coordinates if debugger is True
+        debug_sink = self.debug_sink or get_sink('.')
+        if self.debugger and debug_sink.sample():
+            debug_sink.write('input.png', self.background)
+            # A new copy every time: the sink writes it after we return
+            debug_img = self.background.copy()
+            if debug_img.ndim == 2:
+                debug_img = cv2.cvtColor(debug_img, cv2.COLOR_GRAY2BGR)
+
+            # Draw a rectangle around the chosen match
+            cv2.rectangle(debug_img, top_left, bottom_right, (0, 0, 255), 2)
+
+            # Draw lines and info for the chosen (rightmost) match
+            cv2.line(debug_img, (center_x, 0), (center_x,
+                     edge_background.shape[0]), (0, 255, 0), 2)
+            cv2.line(debug_img, (0, center_y),
+                     (edge_background.shape[1], center_y), (0, 255, 0), 2)
+
+            # Add text with coordinates
+            text = f"x: {center_x}, y: {center_y}"
+            cv2.putText(debug_img, text, (10, 30),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+            cv2.putText(debug_img, f"Confidence: {max_val:.2f}", (
+                10, 60), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+            
+            # cv2.imshow("output",debug_img)
+            # cv2.waitKey(0)
+            # cv2.destroyAllWindows()
+            debug_sink.write('output.png', debug_img)
+
+        result = {
+            "position_from_left": position_from_left,
+            "position_from_bottom": position_from_bottom,
+            "coordinates": [center_x, center_y],
+            "confidence": float(max_val)
+        }
+        if cache_key is not None:
+            self.result_cache.put(cache_key, result)
+        return result
+
+    @staticmethod
+    def _pyramid_matches(edge_background, edge_puzzle_piece, levels, refine_radius,
+                         count=2, candidates=8, min_size=16, backend=None):
+        """
+        Coarse-to-fine version of the exhaustive search.
+
+        Both edge maps are dilated and halved `levels` times (stopping early
+        once the piece would shrink below `min_size` pixels) and the best
+        `candidates` locations are taken on the smallest level. Each one is
+        refined by matching the full-resolution piece inside a window of +/-
+        `refine_radius` pixels. The refined matches then go through the same
+        suppression as the exhaustive search, since two candidates can refine
+        to the same or overlapping places, and the `count` best are kept.
+        """
+        backgrounds = [edge_background]
+        pieces = [edge_puzzle_piece]
+        with span("pyramid"):
+            for _ in range(levels):
+                if min(pieces[-1].shape[:2]) // 2 < min_size:
+                    break
+                backgrounds.append(cv2.pyrDown(cv2.dilate(backgrounds[-1], PYRAMID_DILATE_KERNEL)))
+                pieces.append(cv2.pyrDown(cv2.dilate(pieces[-1], PYRAMID_DILATE_KERNEL)))
+        scale = 2 ** (len(pieces) - 1)
+
+        coarse_h, coarse_w = pieces[-1].shape[:2]
+        margin = max(1, MATCH_MARGIN // scale)
+        with span("correlation"):
+            res = match_template(backgrounds[-1], pieces[-1], backend)
+        with span("peaks"):
+            coarse_matches = find_peaks(res, k=candidates, radius=margin,
+                                        footprint=(coarse_w, coarse_h))
+
+        # Refine every candidate in a small window of the full resolution map
+        h, w = edge_puzzle_piece.shape[:2]
+        res_h = edge_background.shape[0] - h + 1
+        res_w = edge_background.shape[1] - w + 1
+        matches = []
+        for (coarse_x, coarse_y), _ in coarse_matches:
+            x_start = max(0, coarse_x * scale - refine_radius)
+            x_end = min(res_w, coarse_x * scale + refine_radius + 1)
+            y_start = max(0, coarse_y * scale - refine_radius)
+            y_end = min(res_h, coarse_y * scale + refine_radius + 1)
+            window = edge_background[y_start:y_end + h - 1, x_start:x_end + w - 1]
+            with span("correlation"):
+                res = match_template(window, edge_puzzle_piece, backend)
+            with span("peaks"):
+                _, max_val, _, max_loc = cv2.minMaxLoc(res)
+            matches.append(((x_start + max_loc[0], y_start + max_loc[1]), max_val))
+        return suppress_matches(matches, k=count, radius=MATCH_MARGIN, footprint=(w, h))
+
+    def get_puzzle_piece_box(self, img_bytes: bytes):
+        """
+        Identify the bounding box of the non-transparent part of an image.
+        """
+        from PIL import Image
+
+        image = Image.open(io.BytesIO(img_bytes))
+        bbox = image.getbbox()
+        cropped_image = image.crop(bbox)
+        self.center = (bbox[3] - bbox[1]) // 2
+        return cropped_image, bbox[0], bbox[1]
+
+
+PIECE_SUFFIX = "_piece"
+
+
+# Per worker thread state of solve_batch
+_worker_local = threading.local()
+
+
+def _worker_matcher():
+    """The PuzzleMatcher of the calling thread, so workers keep their buffers."""
+    if not hasattr(_worker_local, 'matcher'):
+        _worker_local.matcher = PuzzleMatcher()
+    return _worker_local.matcher
+
+
+def _solve_pair(index, background, puzzle_piece, options):
+    """solve_batch worker. Module level so that process pools can pickle it."""
+    record = {"index": index}
+    try:
+        background, puzzle_piece = attach(background), attach(puzzle_piece)
+        if isinstance(background, CorpusItem):
+            record["background"] = background.name
+            background = load_item(background)
+        elif isinstance(background, str):
+            record["background"] = background
+        if isinstance(puzzle_piece, CorpusItem):
+            record["piece"] = puzzle_piece.name
+            puzzle_piece = load_item(puzzle_piece)
+        elif isinstance(puzzle_piece, str):
+            record["piece"] = puzzle_piece
+        result_cache = None
+        if options["result_cache"]:
+            result_cache = get_result_cache(options["result_cache"])
+        identifier = GeeTestIdentifier(background, puzzle_piece,
+                                       grayscale=options["grayscale"],
+                                       keep_alpha=options["keep_alpha"],
+                                       result_cache=result_cache,
+                                       matcher=_worker_matcher())
+        if identifier.background is None or identifier.puzzle_piece is None:
+            raise ValueError("Failed to read the background or the puzzle piece.")
+        record["result"] = identifier.find_puzzle_piece_position(**options["find_kwargs"])
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    return record
+
+
+def find_pairs(directory, piece=None):
+    """
+    Background/piece pairs saved in `directory`.
+
+    Every image is a background, except `<name>_piece.<ext>` files, which are
+    the piece of `<name>.<ext>`. With `piece`, that one piece is used for
+    every background that has none of its own.
+    """
+    names = sorted(name for name in os.listdir(directory)
+                   if name.lower().endswith(IMAGE_EXTENSIONS))
+    pieces = {}
+    for name in names:
+        stem, ext = os.path.splitext(name)
+        if stem.endswith(PIECE_SUFFIX):
+            pieces[stem[:-len(PIECE_SUFFIX)] + ext] = os.path.join(directory, name)
+    pairs = []
+    for name in names:
+        if os.path.splitext(name)[0].endswith(PIECE_SUFFIX):
+            continue
+        puzzle_piece = pieces.get(name, piece)
+        if puzzle_piece is None:
+            logging.warning(f"No puzzle piece for {name}, skipping it.")
+            continue
+        pairs.append((os.path.join(directory, name), puzzle_piece))
+    return pairs
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Solve every background/piece pair saved in a directory.")
+    parser.add_argument("directory", nargs="?", default="puzzleimgs",
+                        help="Backgrounds and their <name>_piece images.")
+    parser.add_argument("--piece", help="Piece for backgrounds without their own.")
+    parser.add_argument("--output", help="JSONL output file. The default is stdout.")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--executor", choices=sorted(BATCH_EXECUTORS), default="process")
+    parser.add_argument("--grayscale", action="store_true")
+    parser.add_argument("--pyramid-levels", type=int, default=0)
+    parser.add_argument("--band-margin", type=int, default=None,
+                        help="Band search margin. Needs pieces with an alpha channel.")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default=None,
+                        help="Correlation backend. The default is CORRELATION_BACKEND or opencv.")
+    parser.add_argument("--result-cache", help="SQLite file caching results across runs.")
+    args = parser.parse_args(argv)
+
+    pairs = find_pairs(args.directory, args.piece)
+    return write_records(GeeTestIdentifier.solve_batch(
+        pairs, workers=args.workers, executor=args.executor,
+        grayscale=args.grayscale, keep_alpha=args.band_margin is not None,
+        result_cache=args.result_cache,
+        pyramid_levels=args.pyramid_levels, band_margin=args.band_margin,
+        backend=args.backend), args.output, noun="pairs")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def image_key(*images, **params):
+    """
+    Cache key for the decoded `images` and the engine `params`.
+
+    The key hashes the shape, dtype and pixel bytes of every array, so the
+    same picture gives the same key whether it came from a file, from
+    downloaded bytes or from a canvas screenshot. `params` must be JSON
+    serializable. None images (e.g. a missing alpha channel) are allowed.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for image in images:
+        if image is None:
+            digest.update(b'none')
+            continue
+        image = np.ascontiguousarray(image)
+        digest.update(f"{image.shape}{image.dtype}".encode())
+        digest.update(image.data)
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Size-bounded LRU cache of engine results, keyed by image_key().
+
+    Values must be JSON serializable and are returned as JSON round-trips
+    them (tuples come back as lists), so a hit never shares mutable state
+    with the caller. With a path, results are also kept in a SQLite file
+    that survives restarts and can be shared by several processes; memory
+    holds the `max_entries` most recently used ones and the file the
+    `max_stored` most recently used ones.
+    """
+
+    def __init__(self, max_entries=1024, path=None, max_stored=100000):
+        '''
+        Parameters
+        ----------
+        max_entries : int, optional
+            Results kept in memory. The default is 1024.
+        path : str, optional
+            SQLite file to persist results to. The default is memory only.
+        max_stored : int, optional
+            Results kept in the SQLite file. The default is 100000.
+        '''
+        self.max_entries = max_entries
+        self.max_stored = max_stored
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._stored = 0
+        if path:
+            # Only persistent caches need sqlite3
+            import sqlite3
+
+            self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, used REAL NOT NULL)")
+            self._db.commit()
+            self._stored = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def get(self, key, default=None):
+        """The result stored under `key`, or `default` on a miss."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            elif self._db is not None:
+                value = self._load(key)
+                if value is not None:
+                    self._remember(key, value)
+            if value is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+        return json.loads(value)
+
+    def put(self, key, result):
+        """Store `result` under `key`. Returns the result unchanged."""
+        value = json.dumps(result)
+        with self._lock:
+            self._remember(key, value)
+            if self._db is not None:
+                self._store(key, value)
+        return result
+
+    def stats(self):
+        """Hit, miss and eviction counters and the number of entries in memory."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        """Drop every result, including the persisted ones."""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+                self._db.commit()
+                self._stored = 0
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _load(self, key):
+        import sqlite3
+
+        try:
+            row = self._db.execute(
+                "SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._db.execute(
+                    "UPDATE results SET used = ? WHERE key = ?", (time.time(), key))
+                self._db.commit()
+        except sqlite3.Error as e:
+            logging.warning(f"Result cache lookup failed: {e}")
+            return None
+        return row[0] if row else None
+
+    def _store(self, key, value):
+        import sqlite3
+
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, value, used) VALUES (?, ?, ?)",
+                (key, value, time.time()))
+            self._stored += 1
+            if self._stored > self.max_stored:
+                # Other processes may write too, so recount before trimming
+                self._stored = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+                excess = self._stored - self.max_stored
+                if excess > 0:
+                    self._db.execute(
+                        "DELETE FROM results WHERE key IN "
+                        "(SELECT key FROM results ORDER BY used LIMIT ?)", (excess,))
+                    self._stored -= excess
+            self._db.commit()
+        except sqlite3.Error as e:
+            logging.warning(f"Result cache write failed: {e}")
+
+
+_caches = {}
+
+
+def get_result_cache(path=None, **kwargs):
+    """Process-wide ResultCache for `path` (None: memory only), created with `kwargs` on first use."""
+    if path not in _caches:
+        _caches[path] = ResultCache(path=path, **kwargs)
+    return _caches[path]
@@ -0,0 +1,169 @@
+import cv2
+import numpy as np
+
+from .metrics import span
+
+
+class Segmentation:
+    """
+    Result of HueSegmenter.segment().
+
+    Attributes
+    ----------
+    names : list of str
+        Class names, in bit order.
+    bits : numpy.ndarray
+        Per-pixel bit set of the classes whose HSV range contains the pixel.
+    contours : list of tuple
+        External contours of every class mask, in class order, as returned
+        by cv2.findContours.
+    min_area : int
+        Default floor of components().
+    """
+
+    def __init__(self, names, bits, contours, min_area=0):
+        self.names = names
+        self.bits = bits
+        self.contours = contours
+        self.min_area = min_area
+
+    def mask(self, name):
+        """Binary 0/255 mask of the pixels in the HSV range of class `name`."""
+        bit = 1 << self.names.index(name)
+        return np.where(self.bits & bit, np.uint8(255), np.uint8(0))
+
+    def components(self, name, min_area=None, largest_first=True):
+        """
+        Components of class `name` whose contour area is above `min_area`
+        (the segmenter's min_area by default), as dicts with the `area`, the
+        `centroid` (x, y) and the bounding `box` (x, y, w, h), all taken
+        from the contour as cv2.contourArea, cv2.moments and cv2.boundingRect
+        give them (a contour of zero area, i.e. a line, is centered on its
+        points). They come largest first, or in cv2.findContours order.
+        """
+        min_area = self.min_area if min_area is None else min_area
+        components = []
+        with span("components"):
+            for contour in self.contours[self.names.index(name)]:
+                area = cv2.contourArea(contour)
+                if area <= min_area:
+                    continue
+                moments = cv2.moments(contour)
+                if moments['m00'] != 0:
+                    centroid = (moments['m10'] / moments['m00'],
+                                moments['m01'] / moments['m00'])
+                else:
+                    centroid = tuple(float(value)
+                                     for value in contour.reshape(-1, 2).mean(axis=0))
+                components.append({'area': area, 'centroid': centroid,
+                                   'box': cv2.boundingRect(contour)})
+            if largest_first:
+                components.sort(key=lambda component: component['area'], reverse=True)
+        return components
+
+
+def _kernel_passes(kernel):
+    """
+    Offsets (dy, dx) from the anchor of the nonzero cells of `kernel`,
+    grouped in passes: a row then a column for an all-ones kernel, which
+    is separable, else all of them in one pass. The anchor is the kernel
+    center, as for OpenCV's default anchor.
+    """
+    kernel_h, kernel_w = kernel.shape[:2]
+    anchor_y, anchor_x = kernel_h // 2, kernel_w // 2
+    if np.all(kernel):
+        return [[(0, x - anchor_x) for x in range(kernel_w)],
+                [(y - anchor_y, 0) for y in range(kernel_h)]]
+    return [[(y - anchor_y, x - anchor_x) for y, x in zip(*np.nonzero(kernel))]]
+
+
+def _morph_bits(bits, passes, erode):
+    """
+    Erode (or dilate) every class bit of `bits` at once.
+
+    For a flat structuring element, erosion takes the minimum of the
+    neighbourhood and dilation the maximum, which for a 0/1 bit plane are
+    an AND and an OR of the shifted image. Neighbours outside the image are
+    skipped, like OpenCV's default morphology border. The result is the same
+    as cv2.erode / cv2.dilate on each class mask on its own.
+    """
+    height, width = bits.shape
+    reduce = cv2.bitwise_and if erode else cv2.bitwise_or
+    for offsets in passes:
+        out = bits.copy()
+        for dy, dx in offsets:
+            if dy == dx == 0:
+                continue
+            dst = out[max(0, -dy):height - max(0, dy), max(0, -dx):width - max(0, dx)]
+            src = bits[max(0, dy):height - max(0, -dy), max(0, dx):width - max(0, -dx)]
+            reduce(dst, src, dst=dst)
+        bits = out
+    return bits
+
+
+class HueSegmenter:
+    """
+    Segment colour-coded icons of every class in a single pass.
+
+    Each class is an inclusive HSV range, as for cv2.inRange. One lookup
+    table per channel maps every H, S and V value to the bit set of the
+    classes whose range contains it, so three cv2.LUT calls and two ANDs give
+    every pixel its class bits for up to 8 classes, instead of one
+    cv2.inRange over the 3-channel image per class. The opening and closing
+    then run on all the bits at once (see _morph_bits), and every class bit
+    gets its own external contour pass, so touching icons of different
+    colours stay separate components.
+    """
+
+    def __init__(self, hsv_ranges, kernel=None, min_area=0):
+        '''
+        Parameters
+        ----------
+        hsv_ranges : dict
+            Class name -> (lower, upper) HSV bounds, both inclusive.
+        kernel : numpy.ndarray, optional
+            Structuring element for an opening then closing of every class
+            mask. The default is no morphology.
+        min_area : int, optional
+            Default floor of Segmentation.components(): components of at
+            most this many pixels are left out. The default keeps them all.
+        '''
+        if len(hsv_ranges) > 8:
+            raise ValueError("HueSegmenter supports at most 8 classes.")
+        self.names = list(hsv_ranges)
+        self.kernel = kernel
+        self.min_area = min_area
+        self.passes = None if kernel is None else _kernel_passes(kernel)
+        values = np.arange(256)
+        # Single-channel tables: cv2.LUT is much slower with a 3-channel one
+        self.luts = [np.zeros(256, np.uint8) for _ in range(3)]
+        for bit, (lower, upper) in enumerate(hsv_ranges.values()):
+            for channel, lut in enumerate(self.luts):
+                inside = (values >= lower[channel]) & (values <= upper[channel])
+                lut[inside] |= np.uint8(1 << bit)
+
+    def label(self, image, hsv=False):
+        """Class bits of every pixel of a BGR (or, with hsv=True, HSV) image."""
+        if not hsv:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        h, s, v = (cv2.LUT(channel, lut) for channel, lut in zip(cv2.split(image), self.luts))
+        return cv2.bitwise_and(cv2.bitwise_and(h, s), v)
+
+    def segment(self, image, hsv=False):
+        """Label `image` and extract the contours of every class."""
+        with span("hsv_segmentation"):
+            bits = self.label(image, hsv)
+            cleaned = bits
+            if self.passes is not None:
+                # Opening then closing, of every class mask at once
+                cleaned = _morph_bits(_morph_bits(cleaned, self.passes, True), self.passes, False)
+                cleaned = _morph_bits(_morph_bits(cleaned, self.passes, False), self.passes, True)
+
+        with span("contours"):
+            contours = []
+            for index in range(len(self.names)):
+                # 0 or the class bit, findContours only needs nonzero
+                mask = cv2.bitwise_and(cleaned, 1 << index)
+                contours.append(cv2.findContours(
+                    mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[0])
+        return Segmentation(self.names, bits, contours, self.min_area)
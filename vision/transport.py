@@ -0,0 +1,143 @@
+"""
+Shared-memory transport of decoded images to batch worker processes.
+
+A process pool pickles every argument of every task, so sending decoded
+arrays to workers copies all their pixels through a pipe twice. With a
+SharedImageRing, the parent copies each array once into a fixed-size slot
+of a multiprocessing.shared_memory block and sends the worker a SharedImage
+(block name, slot, shape and dtype) instead; the worker maps the block once
+and reads the slot in place. A slot is handed out again only once the task
+that used it is done.
+"""
+import logging
+import os
+from collections import deque, namedtuple
+
+import numpy as np
+
+ALIGNMENT = 64
+
+# Slot size of a ring sized from its first image; larger images get larger
+# slots. 1 MiB holds the 632x500 BGR icon captchas.
+DEFAULT_SLOT_BYTES = 1 << 20
+
+SharedImage = namedtuple("SharedImage", ["memory", "slot", "offset", "shape", "dtype"])
+SharedImage.__doc__ = """
+Reference to an image in a slot of a SharedImageRing, cheap to send to
+worker processes, which read it in place with attach().
+"""
+
+
+class SharedImageRing:
+    """
+    Ring of fixed-size image slots in one shared memory block.
+
+    share() copies an array into the next free slot and returns its
+    SharedImage; release() hands the slots back once the workers are done.
+    Anything that is not an array, or that does not fit or finds no free
+    slot, is returned unchanged and travels the usual (pickled) way. The
+    block is created on the first share() and removed by close().
+
+    On POSIX, create the ring before the worker processes start: they then
+    share the resource tracker of this process, instead of starting their
+    own, which would unlink the block when the first worker exits. Windows
+    has no resource tracker; a block lives as long as a process maps it.
+    """
+
+    def __init__(self, slots, slot_bytes=None):
+        '''
+        Parameters
+        ----------
+        slots : int
+            Number of slots, at least the number of images in flight.
+        slot_bytes : int, optional
+            Size of a slot. The default is the larger of DEFAULT_SLOT_BYTES
+            and the first image shared.
+        '''
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self._memory = None
+        self._free = deque(range(slots))
+        if os.name == "posix":
+            from multiprocessing import resource_tracker
+
+            resource_tracker.ensure_running()
+
+    def share(self, image):
+        """`image` as a SharedImage when it is an array that fits, else `image`."""
+        if not isinstance(image, np.ndarray):
+            return image
+        if self._memory is None:
+            from multiprocessing import shared_memory
+
+            slot_bytes = self.slot_bytes or max(DEFAULT_SLOT_BYTES, image.nbytes)
+            self.slot_bytes = -(-slot_bytes // ALIGNMENT) * ALIGNMENT
+            self._memory = shared_memory.SharedMemory(
+                create=True, size=self.slots * self.slot_bytes)
+        if image.nbytes > self.slot_bytes or not self._free:
+            logging.debug(f"Sending a {image.shape} image without shared memory")
+            return image
+        slot = self._free.popleft()
+        offset = slot * self.slot_bytes
+        view = np.ndarray(image.shape, image.dtype, self._memory.buf, offset)
+        np.copyto(view, image)
+        # The block cannot be closed while a view of it is alive
+        del view
+        return SharedImage(self._memory.name, slot, offset, image.shape, image.dtype.str)
+
+    def release(self, images):
+        """Hand back the slots of the SharedImages among `images`."""
+        for image in images:
+            if isinstance(image, SharedImage):
+                self._free.append(image.slot)
+
+    def close(self):
+        """Remove the shared memory block. Workers must be done with it."""
+        if self._memory is not None:
+            self._memory.close()
+            self._memory.unlink()
+            self._memory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+
+# Blocks mapped by this process, by name
+_attached = {}
+
+
+def attach(image):
+    """
+    The array a SharedImage refers to, as a read-only view of the shared
+    block (mapped on first use). Anything else is returned unchanged.
+    """
+    if not isinstance(image, SharedImage):
+        return image
+    memory = _attached.get(image.memory)
+    if memory is None:
+        from multiprocessing import shared_memory
+
+        memory = _attached[image.memory] = shared_memory.SharedMemory(image.memory)
+    view = np.ndarray(image.shape, np.dtype(image.dtype), memory.buf, image.offset)
+    view.flags.writeable = False
+    return view
+
+
+def collect_completed(pending, ring=None):
+    """
+    Wait for at least one of the `pending` futures, a dict of future ->
+    images it was sent, then yield the results of the completed ones and
+    release their slots of `ring`.
+    """
+    from concurrent.futures import FIRST_COMPLETED, wait
+
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        images = pending.pop(future)
+        if ring is not None:
+            ring.release(images)
+        yield future.result()